@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 import json
+import os
 from datetime import date, datetime
 import random
 
@@ -12,10 +13,15 @@ from utils.quiz_generator import (
     log_quiz_result
 )
 from utils.srs_engine import (
-    get_words_for_review,
-    update_familiarity
+    count_words_due,
+    forecast_reviews,
+    get_word_familiarity,
+    get_learning_stats
 )
-from utils.pronunciation import analyze_pronunciation
+from utils.srs_scheduler import GRADE_AGAIN, GRADE_GOOD, GRADE_EASY, GRADE_PERFECT
+from utils.review_session import ReviewSession, recover_journals
+from utils.pronunciation import practice_word_pronunciation
+from utils.acoustic import compare_with_reference
 from utils.xp_badges import add_xp, update_streak, check_for_badges
 from utils.goals import set_goal, get_goal, update_goal_progress, check_goal_completion
 from utils.leaderboard import get_leaderboard
@@ -24,6 +30,8 @@ from utils.culture_tip import get_culture_tip
 from utils.story_mode import evaluate_story_answer
 from utils.ambient_mode import start_ambient_mode, stop_ambient_mode, is_ambient_active
 from utils import voice_io
+from utils.polish_g2p import build_phoneme_index
+from utils.pronunciation_tips import tip_annotator, tips_for_spans, highlight_markdown
 from utils import sms_reminder
 
 st.set_page_config(page_title="Polish A1 Voice Tutor", page_icon="🇵🇱", layout="wide")
@@ -44,6 +52,28 @@ def load_data():
 
 word_bank, users, quiz_log, stories, leaderboard, grammar_tips, culture_notes = load_data()
 
+# --- Speech Model Warm-up (set VOSK_WARMUP=0 to skip) ---
+@st.cache_resource
+def warm_up_speech_models():
+    return voice_io.warm_up_vosk_model()
+
+if os.getenv('VOSK_WARMUP', '1') != '0':
+    warm_up_speech_models()
+
+# --- Reference Phoneme Index (only new or changed texts are converted) ---
+@st.cache_resource
+def update_phoneme_index():
+    return build_phoneme_index()
+
+update_phoneme_index()
+
+# --- Review Journal Recovery (grades left unflushed by a previous run) ---
+@st.cache_resource
+def recover_review_journals():
+    return recover_journals()
+
+recover_review_journals()
+
 # --- Session State Initialization ---
 if 'current_user' not in st.session_state:
     st.session_state.current_user = users.iloc[0] # Load first user as default
@@ -84,8 +114,24 @@ if page == "Home":
         st.metric(label="Daily Goal Progress", value=progress_text)
     st.progress(min(st.session_state.daily_progress / st.session_state.daily_goal, 1.0), text="Daily Goal Progress")
 
+    st.subheader("Vocabulary Progress")
+    learning_stats = get_learning_stats(user_id=st.session_state.current_user['username'], by_tag=True)
+    col1, col2, col3 = st.columns(3)
+    col1.metric(label="Needs Review", value=learning_stats['needs_review'])
+    col2.metric(label="Learning", value=learning_stats['learning'])
+    col3.metric(label="Known", value=learning_stats['known'])
+    st.progress(learning_stats['completion_percentage'] / 100,
+                text=f"{learning_stats['known']}/{learning_stats['total_words']} words known")
+    if learning_stats['by_tag']:
+        with st.expander("Progress by topic"):
+            st.dataframe(pd.DataFrame.from_dict(learning_stats['by_tag'], orient='index')[
+                ['needs_review', 'learning', 'known', 'completion_percentage']
+            ].round(1))
+
     st.subheader("Word of the Day")
     wotd = st.session_state.word_of_the_day
+    # Render in the background so "Play Audio" is usually a cache hit
+    voice_io.prerender_speech(f"{wotd['word']}. {wotd['example']}")
     col1, col2 = st.columns([2, 1])
     with col1:
         st.write(f"**{wotd['word']}** ({wotd['translation']})")
@@ -134,6 +180,11 @@ elif page == "Word Bank":
 
     # Apply filters
     filtered_words = word_bank.copy()
+    # Familiarity is per user and lives in the SRS store; the CSV column is only the seed
+    user_familiarity = get_word_familiarity(user_id=st.session_state.current_user['username'])
+    filtered_words['familiarity'] = (
+        filtered_words['word'].map(user_familiarity).fillna(filtered_words['familiarity']).astype(int)
+    )
     if tag_filter != "All":
         filtered_words = filtered_words[filtered_words['tags'] == tag_filter]
     if familiarity_filter == "Needs Review (≤3)":
@@ -145,6 +196,12 @@ elif page == "Word Bank":
     if search_term:
         filtered_words = filtered_words[filtered_words['word'].str.contains(search_term, case=False)]
 
+    # Tricky sounds for every listed word come from one annotator pass (cached per word)
+    filtered_words['tricky_sounds'] = [
+        ", ".join(span['pattern'] for span in spans)
+        for spans in tip_annotator.annotate_many(filtered_words['word'])
+    ]
+
     st.write(f"Showing {len(filtered_words)} of {len(word_bank)} words")
     st.dataframe(filtered_words, use_container_width=True)
 
@@ -207,7 +264,7 @@ elif page == "Quiz Mode":
             
             if audio_file:
                 st.write("Processing your translation...")
-                transcribed_text = voice_io.transcribe_audio(audio_file)
+                transcribed_text = voice_io.transcribe_audio_live(audio_file, st.empty())
                 st.write(f"You said: '{transcribed_text}'")
                 
                 # Get feedback
@@ -240,17 +297,36 @@ elif page == "Quiz Mode":
             else:
                 st.info("Click the record button above to start translation")
         elif quiz_type == "Voice Recognition":
-            st.write(f"Say the Polish word for: **{word_bank.sample(1).iloc[0]['translation']}**")
-            audio_file = voice_io.record_audio_streamlit()
-            if audio_file:
-                st.write("Processing your pronunciation...")
-                expected_phrase = word_bank.sample(1).iloc[0]['word']
-                feedback_result = analyze_pronunciation(expected_phrase, audio_file)
-                st.write(f"You said: '{feedback_result['transcription']}'")
-                st.write(f"**Feedback:** {feedback_result['feedback']}")
-                st.write(f"**Score:** {feedback_result['score']:.1f}%")
-                if feedback_result['score'] >= 70:
-                    st.success("Great pronunciation! 🎉")
+            # Pin the prompted word: recording and the checkbox below rerun the
+            # script, and every step must score against the word that was asked
+            st.session_state.voice_quiz_word = word_bank.sample(1).iloc[0].to_dict()
+            st.session_state.voice_quiz_rewarded = False
+
+    if quiz_type == "Voice Recognition" and st.session_state.get('voice_quiz_word') is not None:
+        user_id = st.session_state.current_user['username']
+        quiz_word = st.session_state.voice_quiz_word
+        expected_phrase = quiz_word['word']
+        st.write(f"Say the Polish word for: **{quiz_word['translation']}**")
+        audio_file = voice_io.record_audio_streamlit()
+        if audio_file:
+            st.write("Processing your pronunciation...")
+            feedback_result = practice_word_pronunciation(expected_phrase, audio_file)
+            st.write(f"You said: '{feedback_result['transcribed']}'")
+            st.write(f"**Feedback:** {feedback_result['feedback']}")
+            st.write(f"**Score:** {feedback_result['score']:.1f}%")
+            for suggestion in feedback_result['detailed_feedback']['suggestions']:
+                st.caption(suggestion)
+            if st.checkbox("Compare my voice with the reference audio"):
+                acoustic_result = compare_with_reference(audio_file, expected_phrase)
+                if acoustic_result:
+                    st.write(f"**Sounds like the reference:** {acoustic_result['score']:.1f}%")
+                else:
+                    st.info("Reference audio not available")
+            if feedback_result['score'] >= 70:
+                st.success("Great pronunciation! 🎉")
+                # Reruns (e.g. the checkbox above) must not award the same word twice
+                if not st.session_state.get('voice_quiz_rewarded'):
+                    st.session_state.voice_quiz_rewarded = True
                     new_xp = add_xp(user_id, amount=10)
                     update_streak(user_id)
                     new_badges = check_for_badges(user_id)
@@ -260,16 +336,16 @@ elif page == "Quiz Mode":
                     if check_goal_completion(user_id, 'daily'):
                         st.balloons()
                         st.success("Daily goal completed! 🎉")
-                    st.info(get_grammar_tip(expected_phrase))
-                    st.info(get_culture_tip(expected_phrase))
-                else:
-                    st.info(f"Expected: '{expected_phrase}'. Keep practicing!")
-                if st.button("🔊 Hear Correct Pronunciation"):
-                    correct_audio = voice_io.text_to_speech(expected_phrase)
-                    if correct_audio:
-                        voice_io.play_audio_streamlit(correct_audio)
+                st.info(get_grammar_tip(expected_phrase))
+                st.info(get_culture_tip(expected_phrase))
             else:
-                st.info("Click the record button above to start voice recognition")
+                st.info(f"Expected: '{expected_phrase}'. Keep practicing!")
+            if st.button("🔊 Hear Correct Pronunciation"):
+                correct_audio = voice_io.text_to_speech(expected_phrase)
+                if correct_audio:
+                    voice_io.play_audio_streamlit(correct_audio)
+        else:
+            st.info("Click the record button above to start voice recognition")
 
 # --- Conversation Practice Page ---
 elif page == "Conversation Practice":
@@ -312,7 +388,7 @@ elif page == "Conversation Practice":
                 audio_file = voice_io.record_audio_streamlit()
                 
                 if audio_file:
-                    transcribed_response = voice_io.transcribe_audio(audio_file)
+                    transcribed_response = voice_io.transcribe_audio_live(audio_file, st.empty())
                     st.write(f"**You said:** {transcribed_response}")
                     
                     if transcribed_response and "error" not in transcribed_response.lower():
@@ -354,7 +430,14 @@ elif page == "Story Mode":
         
         col1, col2 = st.columns([3, 1])
         with col1:
-            st.write(story['content'])
+            story_spans = tip_annotator.annotate(story['content'])
+            if st.checkbox("Highlight tricky sounds", value=True):
+                st.markdown(highlight_markdown(story['content'], story_spans))
+                with st.expander("Pronunciation tips for this story"):
+                    for tip in tips_for_spans(story_spans):
+                        st.write(f"- {tip}")
+            else:
+                st.write(story['content'])
         with col2:
             if st.button("🔊 Listen to Story"):
                 story_audio = voice_io.text_to_speech(story['content'])
@@ -379,29 +462,59 @@ elif page == "Story Mode":
 elif page == "Review Deck":
     st.header("Review Deck (Spaced Repetition)")
     user_id = st.session_state.current_user['username']
-    review_words = get_words_for_review(user_id, word_bank)
-    if len(review_words) > 0:
-        st.write(f"You have {len(review_words)} words to review today.")
-        if st.button("Start Review Session"):
-            review_word = review_words.sample(1).iloc[0]
+    due_today = count_words_due(user_id=user_id)
+    review_session = st.session_state.get('review_session')
+    if review_session is not None and (review_session.closed or review_session.user_id != user_id):
+        review_session.close()
+        review_session = st.session_state.review_session = None
+
+    if review_session is None:
+        if due_today > 0:
+            st.write(f"You have {due_today} words to review today.")
+            if st.button("Start Review Session"):
+                st.session_state.review_session = ReviewSession(user_id)
+                st.session_state.review_word = None
+                st.rerun()
+        else:
+            st.success("🎉 No words to review today! Great job!")
+    else:
+        # Grades are buffered in the session and committed in batches
+        if st.session_state.get('review_word') is None:
+            next_words = review_session.get_words_for_review(1)
+            st.session_state.review_word = next_words.iloc[0].to_dict() if len(next_words) > 0 else None
+        review_word = st.session_state.review_word
+        if review_word is None:
+            review_session.close()
+            st.session_state.review_session = None
+            st.success("🎉 Review session complete! Great job!")
+        else:
+            st.write(f"Reviewed this session: {review_session.stats['graded']}")
             st.subheader("Review Word")
             st.write(f"**{review_word['word']}**")
             st.write(f"Example: {review_word['example']}")
             col1, col2, col3, col4 = st.columns(4)
-            if col1.button("😰 Hard"):
-                update_familiarity(user_id, False)
-                st.info("Marked as hard - will review again soon")
-            if col2.button("😐 Good"):
-                update_familiarity(user_id, True)
-                st.info("Marked as good - will review in a few days")
-            if col3.button("😊 Easy"):
-                update_familiarity(user_id, True)
-                st.info("Marked as easy - will review in a week")
-            if col4.button("🎯 Perfect"):
-                update_familiarity(user_id, True)
-                st.info("Marked as perfect - will review in a month")
-    else:
-        st.success("🎉 No words to review today! Great job!")
+            grade_buttons = [
+                (col1, "😰 Hard", GRADE_AGAIN),
+                (col2, "😐 Good", GRADE_GOOD),
+                (col3, "😊 Easy", GRADE_EASY),
+                (col4, "🎯 Perfect", GRADE_PERFECT)
+            ]
+            for column, label, grade in grade_buttons:
+                if column.button(label):
+                    review_session.grade(review_word['word'], grade)
+                    st.session_state.review_word = None
+                    st.rerun()
+            if st.button("End Session"):
+                review_session.close()
+                st.session_state.review_session = None
+                st.session_state.review_word = None
+                st.rerun()
+
+    st.subheader("Upcoming Reviews")
+    spread_new = st.checkbox("Spread new words (at most 5 per day)")
+    forecast = forecast_reviews(days=14, user_id=user_id, max_new_per_day=5 if spread_new else None)
+    if not forecast.empty:
+        st.bar_chart(forecast.set_index('date')['reviews'])
 
 # --- Leaderboard Page ---
 elif page == "Leaderboard":
@@ -0,0 +1,45 @@
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import srs_engine
+from utils.srs_store import SRSStore
+from utils.srs_simulation import write_word_bank
+
+@pytest.fixture
+def deck(tmp_path):
+    word_bank_path = str(tmp_path / 'word_bank.csv')
+    write_word_bank(word_bank_path, 20)
+    store = SRSStore(str(tmp_path / 'srs.db'))
+    srs_engine.set_clock(lambda: datetime(2030, 1, 1, 9, 0))
+    yield word_bank_path, store
+    srs_engine.set_clock(None)
+    store.close()
+
+@pytest.mark.parametrize('algorithm', ['buckets', 'sm2', 'fsrs'])
+def test_migrate_algorithm_leaves_new_cards_new(deck, algorithm):
+    word_bank_path, store = deck
+    assert srs_engine.count_words_due(word_bank_path, 'u', store) == 20
+
+    srs_engine.migrate_algorithm(algorithm, ['u'], word_bank_path, store)
+
+    for card in store.get_cards('u'):
+        assert card['last_review'] is None
+        assert card['next_review'] is None
+    assert srs_engine.count_words_due(word_bank_path, 'u', store) == 20
+    assert srs_engine.forecast_reviews(1, word_bank_path, 'u', store)['new'].iloc[0] == 20
+
+def test_migrate_algorithm_reschedules_reviewed_cards(deck):
+    word_bank_path, store = deck
+    srs_engine.update_familiarity('słowo0', True, word_bank_path, 'u', store)
+    before = store.get_card('u', 'słowo0')
+
+    assert srs_engine.migrate_algorithm('sm2', ['u'], word_bank_path, store) == {'u': 1}
+
+    after = store.get_card('u', 'słowo0')
+    assert after['last_review'] == before['last_review']
+    assert after['next_review'] != before['next_review']
+    assert store.get_card('u', 'słowo1')['last_review'] is None
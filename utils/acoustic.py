@@ -0,0 +1,232 @@
+# Acoustic Comparison Module
+#
+# Compares a learner's recording with the reference TTS rendering of the same
+# phrase: both are turned into MFCC-like features with NumPy and aligned with
+# dynamic time warping restricted to a Sakoe-Chiba band. Unlike text scoring,
+# this can tell a heavily accented but correctly recognized word from a
+# native-like one.
+#
+# Reference features are computed once per phrase and stored next to the TTS
+# cache, so only the learner's side is computed live. Precompute them for the
+# whole word bank with:
+#   python -m utils.acoustic
+
+import csv
+import os
+import sys
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import voice_io
+from utils.audio_cache import make_tts_key
+from utils.prosody import frame_signal
+
+# Bump when the feature extraction changes so stored reference features are recomputed
+FEATURE_VERSION = 1
+FEATURE_CACHE_DIR = 'data/features'
+FEATURE_MEMORY_CACHE_SIZE = 512
+
+N_MFCC = 13
+N_MELS = 26
+FRAME_MS = 25
+HOP_MS = 10
+PRE_EMPHASIS = 0.97
+# Sakoe-Chiba band half-width as a fraction of the longer sequence
+DTW_BAND_RATIO = 0.15
+# Mean per-step DTW distance that maps to a score of ~37 (exp(-1))
+DISTANCE_SCALE = 5.0
+
+@lru_cache(maxsize=8)
+def _mel_filterbank(sample_rate, n_fft, n_mels):
+    """Triangular filters evenly spaced on the mel scale, shape (n_mels, n_fft // 2 + 1)"""
+    def hz_to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def mel_to_hz(mel):
+        return 700.0 * (10.0 ** (mel / 2595.0) - 1.0)
+
+    mel_points = np.linspace(hz_to_mel(0.0), hz_to_mel(sample_rate / 2), n_mels + 2)
+    bins = np.floor((n_fft + 1) * mel_to_hz(mel_points) / sample_rate).astype(int)
+    freqs = np.arange(n_fft // 2 + 1)
+    left, centre, right = bins[:-2, None], bins[1:-1, None], bins[2:, None]
+    rising = (freqs - left) / np.maximum(centre - left, 1)
+    falling = (right - freqs) / np.maximum(right - centre, 1)
+    return np.clip(np.minimum(rising, falling), 0.0, None).astype(np.float32)
+
+@lru_cache(maxsize=8)
+def _dct_matrix(n_mels, n_mfcc):
+    """Orthonormal DCT-II basis, shape (n_mels, n_mfcc)"""
+    n = np.arange(n_mels)
+    k = np.arange(n_mfcc)
+    basis = np.cos(np.pi / n_mels * (n[:, None] + 0.5) * k[None, :]) * np.sqrt(2.0 / n_mels)
+    basis[:, 0] /= np.sqrt(2.0)
+    return basis.astype(np.float32)
+
+def extract_mfcc(signal, sample_rate, n_mfcc=N_MFCC, n_mels=N_MELS, frame_ms=FRAME_MS, hop_ms=HOP_MS):
+    """
+    MFCC-like features of a recording, all frames at once
+
+    Args:
+        signal (np.ndarray): Mono samples (float in [-1, 1] or 16-bit integers)
+        sample_rate (int): Sample rate of the signal
+        n_mfcc (int): Cepstral coefficients per frame
+        n_mels (int): Mel filters
+        frame_ms (int): Analysis window in milliseconds
+        hop_ms (int): Frame step in milliseconds
+
+    Returns:
+        np.ndarray: float32 features of shape (n_frames, n_mfcc), mean-normalized
+                    per coefficient so channel and speaker offsets cancel out
+    """
+    signal = np.asarray(signal)
+    if signal.dtype.kind in 'iu':
+        signal = signal.astype(np.float32) / 32768.0
+    signal = signal.astype(np.float32)
+    if len(signal) > 1:
+        signal = np.append(signal[0], signal[1:] - PRE_EMPHASIS * signal[:-1])
+    frame_len = int(sample_rate * frame_ms / 1000)
+    hop = int(sample_rate * hop_ms / 1000)
+    frames = frame_signal(signal, frame_len, hop) * np.hamming(frame_len).astype(np.float32)
+    n_fft = 1 << int(np.ceil(np.log2(frame_len)))
+    spectrum = np.fft.rfft(frames, n_fft, axis=1)
+    power = (spectrum.real ** 2 + spectrum.imag ** 2) / n_fft
+    mel_energy = power @ _mel_filterbank(sample_rate, n_fft, n_mels).T
+    features = np.log(mel_energy + 1e-10) @ _dct_matrix(n_mels, n_mfcc)
+    return (features - features.mean(axis=0)).astype(np.float32)
+
+def dtw_distance(query, reference, band_ratio=DTW_BAND_RATIO):
+    """
+    Dynamic time warping distance restricted to a Sakoe-Chiba band
+
+    Args:
+        query (np.ndarray): Features of shape (n, d)
+        reference (np.ndarray): Features of shape (m, d)
+        band_ratio (float): Band half-width as a fraction of the longer sequence;
+            it is always at least the length difference, so the end is reachable
+
+    Returns:
+        float: Accumulated frame distance divided by n + m (inf for empty input)
+    """
+    n, m = len(query), len(reference)
+    if n == 0 or m == 0:
+        return float('inf')
+    band = max(int(band_ratio * max(n, m)), abs(n - m)) + 1
+    inf = np.float32(np.inf)
+    previous = np.full(m + 1, inf, dtype=np.float32)
+    previous[0] = 0.0
+    for i in range(1, n + 1):
+        # The band follows the diagonal scaled to the two lengths
+        centre = int(round(i * m / n))
+        lo, hi = max(1, centre - band), min(m, centre + band)
+        local = np.sqrt(((reference[lo - 1:hi] - query[i - 1]) ** 2).sum(axis=1))
+        current = np.full(m + 1, inf, dtype=np.float32)
+        # Vertical and diagonal steps come from the previous row in one vector step
+        best = np.minimum(previous[lo:hi + 1], previous[lo - 1:hi]) + local
+        # Horizontal steps depend on the cell to the left, so they are a scan
+        for offset in range(1, len(best)):
+            if best[offset - 1] + local[offset] < best[offset]:
+                best[offset] = best[offset - 1] + local[offset]
+        current[lo:hi + 1] = best
+        previous = current
+    return float(previous[m]) / (n + m)
+
+def distance_to_score(distance, scale=DISTANCE_SCALE):
+    """Map a DTW distance to a 0-100 similarity score"""
+    if not np.isfinite(distance):
+        return 0.0
+    return float(100.0 * np.exp(-distance / scale))
+
+def _recording_features(audio):
+    params, pcm = voice_io.load_audio(audio)
+    samples = voice_io.preprocess_audio(params, pcm)
+    return extract_mfcc(samples, voice_io.VOSK_SAMPLE_RATE)
+
+# Reference features: in memory, backed by .npy files keyed by the TTS content address
+_reference_cache = OrderedDict()
+_reference_cache_lock = threading.Lock()
+
+def get_reference_features(text, voice_id="default", rate=voice_io.DEFAULT_TTS_RATE,
+                           volume=voice_io.DEFAULT_TTS_VOLUME, cache_dir=FEATURE_CACHE_DIR):
+    """
+    Features of the reference TTS rendering of a phrase
+
+    Args:
+        text (str): Expected phrase
+        voice_id (str): Voice identifier
+        rate (int): Speech rate
+        volume (float): Volume level
+        cache_dir (str): Directory for stored features
+
+    Returns:
+        np.ndarray: Features (see extract_mfcc), or None if no reference audio is available
+    """
+    key = make_tts_key(text, voice_id, rate, volume)
+    with _reference_cache_lock:
+        if key in _reference_cache:
+            _reference_cache.move_to_end(key)
+            return _reference_cache[key]
+    path = os.path.join(cache_dir, f"{key}.v{FEATURE_VERSION}.npy")
+    if os.path.exists(path):
+        features = np.load(path)
+    else:
+        audio_path = voice_io.text_to_speech(text, voice_id, rate, volume)
+        if not audio_path:
+            return None
+        features = _recording_features(audio_path)
+        os.makedirs(cache_dir, exist_ok=True)
+        temp_path = path + '.tmp.npy'
+        np.save(temp_path, features)
+        os.replace(temp_path, path)
+    with _reference_cache_lock:
+        _reference_cache[key] = features
+        while len(_reference_cache) > FEATURE_MEMORY_CACHE_SIZE:
+            _reference_cache.popitem(last=False)
+    return features
+
+def compare_with_reference(audio, expected_text):
+    """
+    Acoustic similarity between a recording and the reference rendering
+
+    Args:
+        audio: Recorded WAV bytes or path to audio file
+        expected_text (str): Expected phrase
+
+    Returns:
+        dict: {'distance': float, 'score': 0-100, 'frames': (learner, reference)},
+              memoized by audio content; None if no reference audio is available
+    """
+    reference = get_reference_features(expected_text)
+    if reference is None:
+        return None
+
+    def compute():
+        features = _recording_features(audio)
+        distance = dtw_distance(features, reference)
+        return {'distance': distance, 'score': distance_to_score(distance), 'frames': (len(features), len(reference))}
+
+    return voice_io.cached_audio_result('acoustic', audio, (expected_text, FEATURE_VERSION), compute)
+
+def precompute_reference_features(word_bank_path='data/word_bank.csv'):
+    """
+    Compute and store reference features for every word in the word bank
+
+    Returns:
+        dict: Counts of words with features ('ready') and without reference audio ('missing')
+    """
+    summary = {'ready': 0, 'missing': 0}
+    with open(word_bank_path, newline='', encoding='utf-8') as f:
+        words = [row['word'] for row in csv.DictReader(f) if row.get('word')]
+    for word in words:
+        if get_reference_features(word) is None:
+            summary['missing'] += 1
+        else:
+            summary['ready'] += 1
+    return summary
+
+if __name__ == '__main__':
+    result = precompute_reference_features()
+    print(f"Reference features: {result['ready']} ready, {result['missing']} without audio")
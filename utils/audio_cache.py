@@ -0,0 +1,148 @@
+# Audio Cache Module
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+TTS_CACHE_DIR = 'data/tts_cache'
+TTS_CACHE_MAX_BYTES = 200 * 1024 * 1024
+# In-progress renders are written next to the cache entries under this prefix;
+# ones older than STALE_RENDER_SECONDS were left by a crashed render
+RENDER_PREFIX = '.render-'
+STALE_RENDER_SECONDS = 10 * 60
+
+def make_tts_key(text, voice_id, rate, volume):
+    """
+    Build the content address of a TTS rendering
+
+    Args:
+        text (str): Text to be spoken
+        voice_id (str): Voice identifier
+        rate (int): Speech rate
+        volume (float): Volume level
+
+    Returns:
+        str: Hex digest identifying the rendered audio
+    """
+    payload = json.dumps([text, voice_id, rate, volume], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class AudioCache:
+    """
+    Disk-backed, content-addressed audio cache with a byte budget and LRU eviction.
+
+    The in-memory index is built from one directory scan (ordered by mtime) and then
+    kept up to date, so lookups never list the cache directory again. The same scan
+    removes stale render files left behind by a crash.
+    """
+
+    def __init__(self, cache_dir=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES, suffix='.wav'):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._index = None  # key -> size in bytes, least recently used first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def path_for(self, key):
+        """Path where the audio for a key is (or would be) stored"""
+        return os.path.join(self.cache_dir, key + self.suffix)
+
+    def _load_index(self):
+        if self._index is not None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entries = []
+        stale_before = time.time() - STALE_RENDER_SECONDS
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.startswith(RENDER_PREFIX):
+                # Renders still in progress are recent; older ones were orphaned by a crash
+                try:
+                    if entry.stat().st_mtime < stale_before:
+                        os.remove(entry.path)
+                except OSError:
+                    pass
+                continue
+            # Skip other temp files (dot-prefixed)
+            if entry.is_file() and entry.name.endswith(self.suffix) and not entry.name.startswith('.'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name[:-len(self.suffix)], stat.st_size))
+        entries.sort()
+        self._index = OrderedDict((key, size) for _, key, size in entries)
+        self._total_bytes = sum(self._index.values())
+
+    def get(self, key):
+        """
+        Look up cached audio and mark it as recently used
+
+        Returns:
+            str: Path to the cached file, or None on a miss
+        """
+        with self._lock:
+            self._load_index()
+            if key not in self._index:
+                return None
+            path = self.path_for(key)
+            if not os.path.exists(path):
+                self._total_bytes -= self._index.pop(key)
+                return None
+            self._index.move_to_end(key)
+            try:
+                os.utime(path)  # persist recency for the next process
+            except OSError:
+                pass
+            return path
+
+    def put(self, key, source_path):
+        """
+        Move a rendered file into the cache under its key
+
+        Args:
+            key (str): Content address from make_tts_key
+            source_path (str): Freshly rendered file (moved, not copied)
+
+        Returns:
+            str: Path to the cached file
+        """
+        with self._lock:
+            self._load_index()
+            path = self.path_for(key)
+            os.replace(source_path, path)
+            size = os.path.getsize(path)
+            if key in self._index:
+                self._total_bytes -= self._index.pop(key)
+            self._index[key] = size
+            self._total_bytes += size
+            self._evict(keep=key)
+            return path
+
+    def _evict(self, keep=None):
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            key = next(iter(self._index))
+            if key == keep:
+                break
+            self._total_bytes -= self._index.pop(key)
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
+
+    def stats(self):
+        """
+        Get cache usage
+
+        Returns:
+            dict: Number of entries, bytes used and byte budget
+        """
+        with self._lock:
+            self._load_index()
+            return {
+                'entries': len(self._index),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes
+            }
+
+tts_cache = AudioCache()
@@ -0,0 +1,217 @@
+# Pre-rendered Audio Pack Module
+#
+# Usage:
+#   python -m utils.audio_pack --workers 4
+#
+# Renders every word, example sentence and story (whole text and each sentence)
+# into data/audio/ and records them in data/audio/manifest.json. Files are named
+# by the same content address as the TTS cache (text + voice settings), so a
+# rebuild only renders rows whose text or voice settings changed.
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.audio_cache import make_tts_key
+from utils.text_utils import split_sentences
+
+AUDIO_PACK_DIR = 'data/audio'
+MANIFEST_NAME = 'manifest.json'
+
+def collect_pack_texts(word_bank_path='data/word_bank.csv', stories_path='data/stories.csv'):
+    """
+    Collect every text the app plays back
+
+    Args:
+        word_bank_path (str): Path to word bank CSV
+        stories_path (str): Path to stories CSV
+
+    Returns:
+        dict: text -> source label ('word', 'example', 'story' or 'story_sentence')
+    """
+    texts = {}
+    if os.path.exists(word_bank_path):
+        with open(word_bank_path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                for column in ('word', 'example'):
+                    if row.get(column):
+                        texts.setdefault(row[column].strip(), column)
+                if row.get('word') and row.get('example'):
+                    # Word of the Day plays "word. example" as one clip
+                    texts.setdefault(f"{row['word'].strip()}. {row['example'].strip()}", 'word_of_the_day')
+    if os.path.exists(stories_path):
+        with open(stories_path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                if row.get('content'):
+                    texts.setdefault(row['content'].strip(), 'story')
+                    for sentence in split_sentences(row['content']):
+                        texts.setdefault(sentence, 'story_sentence')
+    return texts
+
+def load_manifest(pack_dir=AUDIO_PACK_DIR):
+    """
+    Load the audio pack manifest
+
+    Returns:
+        dict: {'voice': {...}, 'entries': {key: {'text', 'file', 'source', 'sha256'}}}
+    """
+    path = os.path.join(pack_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {'voice': None, 'entries': {}}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _save_manifest(manifest, pack_dir):
+    path = os.path.join(pack_dir, MANIFEST_NAME)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(temp_path, path)
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _render(text, output_path, voice_id, rate, volume):
+    """Render one text in a worker process (each process owns its own TTS worker/engine)"""
+    from utils.tts_worker import tts_worker
+    from utils.temp_audio import temp_audio
+    rendered = tts_worker.submit(text, os.path.dirname(output_path), voice_id, rate, volume).result()
+    if os.path.getsize(rendered) == 0:
+        temp_audio.release(rendered)
+        raise RuntimeError("TTS engine produced no audio")
+    os.replace(rendered, output_path)
+    temp_audio.forget(rendered)
+    return _file_sha256(output_path)
+
+def build_audio_pack(word_bank_path='data/word_bank.csv', stories_path='data/stories.csv',
+                     pack_dir=AUDIO_PACK_DIR, voice_id="default", rate=150, volume=0.8,
+                     workers=None, force=False, progress=None):
+    """
+    Render missing or changed audio for the word bank and stories
+
+    Args:
+        word_bank_path (str): Path to word bank CSV
+        stories_path (str): Path to stories CSV
+        pack_dir (str): Output directory for WAV files and the manifest
+        voice_id (str): Voice identifier
+        rate (int): Speech rate
+        volume (float): Volume level
+        workers (int): Number of render processes (default: CPU count)
+        force (bool): Re-render everything
+        progress (callable): Optional function called with (text, error or None)
+
+    Returns:
+        dict: Counts of rendered, unchanged, removed and failed entries
+    """
+    os.makedirs(pack_dir, exist_ok=True)
+    manifest = load_manifest(pack_dir)
+    entries = manifest.get('entries', {})
+    wanted = {}
+    for text, source in collect_pack_texts(word_bank_path, stories_path).items():
+        wanted[make_tts_key(text, voice_id, rate, volume)] = (text, source)
+
+    summary = {'rendered': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+    for key in list(entries):
+        if key not in wanted:
+            try:
+                os.remove(os.path.join(pack_dir, entries[key]['file']))
+            except OSError:
+                pass
+            del entries[key]
+            summary['removed'] += 1
+
+    todo = []
+    for key, (text, source) in wanted.items():
+        entry = entries.get(key)
+        if not force and entry and os.path.exists(os.path.join(pack_dir, entry['file'])):
+            entry['source'] = source
+            summary['unchanged'] += 1
+        else:
+            todo.append((key, text, source))
+
+    start = time.perf_counter()
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(_render, text, os.path.join(pack_dir, key + '.wav'), voice_id, rate, volume): (key, text, source)
+                for key, text, source in todo
+            }
+            for future in as_completed(futures):
+                key, text, source = futures[future]
+                try:
+                    sha256 = future.result()
+                except Exception as e:
+                    summary['failed'] += 1
+                    if progress:
+                        progress(text, e)
+                    continue
+                entries[key] = {'text': text, 'file': key + '.wav', 'source': source, 'sha256': sha256}
+                summary['rendered'] += 1
+                if progress:
+                    progress(text, None)
+    manifest = {'voice': {'voice_id': voice_id, 'rate': rate, 'volume': volume}, 'entries': entries}
+    _save_manifest(manifest, pack_dir)
+    summary['seconds'] = time.perf_counter() - start
+    return summary
+
+# Runtime lookup: the manifest is read once and re-read only when it changes
+_manifest_cache = {}
+
+def get_pack_audio(key, pack_dir=AUDIO_PACK_DIR):
+    """
+    Find a pre-rendered file for a TTS content address
+
+    Args:
+        key (str): Content address from make_tts_key
+        pack_dir (str): Audio pack directory
+
+    Returns:
+        str: Path to the WAV file, or None if the pack does not have it
+    """
+    path = os.path.join(pack_dir, MANIFEST_NAME)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    cached = _manifest_cache.get(pack_dir)
+    if cached is None or cached[0] != mtime:
+        try:
+            cached = (mtime, load_manifest(pack_dir).get('entries', {}))
+        except (OSError, ValueError):
+            return None
+        _manifest_cache[pack_dir] = cached
+    entry = cached[1].get(key)
+    if entry is None:
+        return None
+    audio_path = os.path.join(pack_dir, entry['file'])
+    return audio_path if os.path.exists(audio_path) else None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the pre-rendered audio pack")
+    parser.add_argument('--word-bank', default='data/word_bank.csv')
+    parser.add_argument('--stories', default='data/stories.csv')
+    parser.add_argument('--output', default=AUDIO_PACK_DIR, help="Audio pack directory")
+    parser.add_argument('--workers', type=int, default=None, help="Render processes (default: CPU count)")
+    parser.add_argument('--force', action='store_true', help="Re-render every entry")
+    args = parser.parse_args(argv)
+
+    def report(text, error):
+        print(f"{'FAILED' if error else 'rendered'}: {text[:60]}" + (f" ({error})" if error else ""))
+
+    summary = build_audio_pack(args.word_bank, args.stories, args.output,
+                               workers=args.workers, force=args.force, progress=report)
+    print(f"Rendered {summary['rendered']}, unchanged {summary['unchanged']}, "
+          f"removed {summary['removed']}, failed {summary['failed']} in {summary['seconds']:.1f}s")
+
+if __name__ == '__main__':
+    main()
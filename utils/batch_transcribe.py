@@ -0,0 +1,221 @@
+# Batch Transcription and Re-scoring Module
+#
+# Usage:
+#   python -m utils.batch_transcribe recordings.csv --output results.jsonl --workers 4
+#
+# The manifest is a CSV with an 'audio_path' column and an optional
+# 'expected_text' column. Results are appended as each recording finishes, so an
+# interrupted run picks up where it stopped when started again with the same output.
+# Recordings that failed are retried on the next run; their new row is appended,
+# so the last row for an audio_path is the current one.
+#
+# Recordings with expected text are scored by pronunciation.analyze_pronunciation,
+# the same grammar-constrained, confidence-weighted scoring learners see in the app.
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import voice_io
+from utils import pronunciation
+
+RESULT_FIELDS = ['audio_path', 'expected_text', 'transcribed_text', 'similarity_score',
+                 'audio_seconds', 'decode_seconds', 'real_time_factor', 'error']
+
+_worker_model_path = voice_io.DEFAULT_VOSK_MODEL_PATH
+
+def _init_worker(model_path):
+    """Process pool initializer: load the Vosk model once per worker process"""
+    global _worker_model_path
+    _worker_model_path = model_path
+    voice_io.get_vosk_model(model_path)
+
+def process_recording(audio_path, expected_text=None):
+    """
+    Transcribe and (optionally) score one recording
+
+    Args:
+        audio_path (str): Path to a WAV recording
+        expected_text (str): Expected text, or None to only transcribe
+
+    Returns:
+        dict: One result row (see RESULT_FIELDS)
+    """
+    row = {field: None for field in RESULT_FIELDS}
+    row['audio_path'] = audio_path
+    row['expected_text'] = expected_text
+    start = time.perf_counter()
+    try:
+        params, pcm = voice_io.load_audio(audio_path)
+        frame_bytes = params['sample_width'] * params['channels']
+        row['audio_seconds'] = len(pcm) / frame_bytes / params['sample_rate']
+        if expected_text:
+            result = pronunciation.analyze_pronunciation(audio_path, expected_text, _worker_model_path)
+            row['transcribed_text'] = result['transcribed_text']
+            row['similarity_score'] = result['similarity_score']
+            row['error'] = result['error']
+        else:
+            row['transcribed_text'] = voice_io.transcribe_audio_detailed(audio_path, None, _worker_model_path)['text']
+    except Exception as e:
+        row['error'] = str(e)
+    row['decode_seconds'] = time.perf_counter() - start
+    if row['audio_seconds']:
+        row['real_time_factor'] = row['decode_seconds'] / row['audio_seconds']
+    return row
+
+def read_manifest(manifest_path):
+    """
+    Read the recordings to process
+
+    Args:
+        manifest_path (str): CSV with 'audio_path' and optional 'expected_text'
+
+    Returns:
+        list: (audio_path, expected_text) tuples
+    """
+    with open(manifest_path, newline='', encoding='utf-8') as f:
+        return [(row['audio_path'], row.get('expected_text') or None) for row in csv.DictReader(f)]
+
+def read_completed(output_path):
+    """
+    Get the recordings already processed without error in an output file (the checkpoint)
+
+    Args:
+        output_path (str): JSONL or CSV results file
+
+    Returns:
+        set: audio_path values whose latest row has no error
+    """
+    if not os.path.exists(output_path):
+        return set()
+    latest = {}
+    with open(output_path, newline='', encoding='utf-8') as f:
+        if output_path.endswith('.csv'):
+            for row in csv.DictReader(f):
+                if None in row.values():
+                    continue  # Ignore a row truncated by an interrupted run
+                latest[row['audio_path']] = row.get('error')
+        else:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                    latest[row['audio_path']] = row.get('error')
+                except (ValueError, KeyError):
+                    pass  # Ignore a line truncated by an interrupted run
+    return {path for path, error in latest.items() if not error}
+
+def _ends_mid_line(path):
+    """Whether a non-empty file does not end with a newline"""
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b'\n'
+    except OSError:
+        return False
+
+class _ResultWriter:
+    """Append result rows to a JSONL or CSV file, flushing after every row"""
+
+    def __init__(self, output_path):
+        self.is_csv = output_path.endswith('.csv')
+        write_header = self.is_csv and (not os.path.exists(output_path) or os.path.getsize(output_path) == 0)
+        needs_newline = not write_header and _ends_mid_line(output_path)
+        self.file = open(output_path, 'a', newline='', encoding='utf-8')
+        # Close a row cut short by an interrupted run, so the next row starts on its own line
+        if needs_newline:
+            self.file.write('\n')
+        if self.is_csv:
+            self.writer = csv.DictWriter(self.file, fieldnames=RESULT_FIELDS)
+            if write_header:
+                self.writer.writeheader()
+
+    def write(self, row):
+        if self.is_csv:
+            self.writer.writerow(row)
+        else:
+            self.file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+def run_batch(manifest_path, output_path, workers=None, model_path=voice_io.DEFAULT_VOSK_MODEL_PATH, progress=None):
+    """
+    Transcribe and re-score every recording in a manifest on a process pool
+
+    Args:
+        manifest_path (str): CSV manifest (see read_manifest)
+        output_path (str): Results file; '.csv' writes CSV, anything else JSONL
+        workers (int): Number of worker processes (default: CPU count)
+        model_path (str): Path to the Vosk model directory
+        progress (callable): Optional function called with each result row
+
+    Returns:
+        dict: Run summary with counts, audio/wall seconds and real-time factors
+    """
+    completed = read_completed(output_path)
+    pending = [(path, expected) for path, expected in read_manifest(manifest_path) if path not in completed]
+    summary = {
+        'skipped': len(completed),
+        'processed': 0,
+        'errors': 0,
+        'audio_seconds': 0.0,
+        'decode_seconds': 0.0,
+        'wall_seconds': 0.0
+    }
+    start = time.perf_counter()
+    writer = _ResultWriter(output_path)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_path,)) as pool:
+            futures = [pool.submit(process_recording, path, expected) for path, expected in pending]
+            for future in as_completed(futures):
+                row = future.result()
+                writer.write(row)
+                summary['processed'] += 1
+                if row['error']:
+                    summary['errors'] += 1
+                summary['audio_seconds'] += row['audio_seconds'] or 0.0
+                summary['decode_seconds'] += row['decode_seconds'] or 0.0
+                if progress:
+                    progress(row)
+    finally:
+        writer.close()
+    summary['wall_seconds'] = time.perf_counter() - start
+    audio_seconds = summary['audio_seconds']
+    # Wall-clock RTF is what the pool achieves; per-worker RTF is the decoder's own speed
+    summary['real_time_factor'] = summary['wall_seconds'] / audio_seconds if audio_seconds else None
+    summary['per_worker_real_time_factor'] = summary['decode_seconds'] / audio_seconds if audio_seconds else None
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch transcription and re-scoring of recordings")
+    parser.add_argument('manifest', help="CSV with audio_path and optional expected_text columns")
+    parser.add_argument('--output', default='batch_results.jsonl', help="Results file (.jsonl or .csv)")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--model', default=voice_io.DEFAULT_VOSK_MODEL_PATH, help="Vosk model directory")
+    args = parser.parse_args(argv)
+
+    def report(row):
+        if row['error']:
+            status = f"error: {row['error']}"
+        else:
+            status = f"RTF {row['real_time_factor']:.2f}" if row['real_time_factor'] is not None else "empty"
+        print(f"{row['audio_path']}: {status}")
+
+    summary = run_batch(args.manifest, args.output, args.workers, args.model, progress=report)
+    print(f"Processed {summary['processed']} recordings ({summary['errors']} errors, "
+          f"{summary['skipped']} already done) in {summary['wall_seconds']:.1f}s")
+    if summary['real_time_factor'] is not None:
+        print(f"Real-time factor: {summary['real_time_factor']:.3f} wall, "
+              f"{summary['per_worker_real_time_factor']:.3f} per worker")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+# Due Queue Module
+#
+# In-memory index of one user's cards ordered by (due date, familiarity), kept
+# up to date as reviews are applied, so the Review Deck never scans or sorts
+# the whole deck on a page render.
+
+import heapq
+import threading
+from bisect import bisect_right, insort
+from datetime import date
+
+def day_number(value):
+    """Day number (proleptic ordinal) of a 'YYYY-MM-DD' string or date; 0 for None"""
+    if value is None or value == '':
+        return 0
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10]).toordinal()
+    return value.toordinal()
+
+class DueQueue:
+    """
+    Priority index of a user's cards by (due day, familiarity, word).
+
+    Scheduled cards live in a binary heap with lazy deletion: a review pushes
+    a new entry and leaves the old one behind as stale. top() walks the heap
+    from the root and only expands nodes that could still be due, so the k
+    most urgent cards cost O(k log n) without modifying the heap. Cards never
+    scheduled are always due and sit in a second heap by familiarity; they are
+    served after the due reviews, so new words never starve reviews. Per-day
+    due counts answer count_due() without visiting individual cards.
+    """
+
+    def __init__(self, cards=()):
+        self._lock = threading.Lock()
+        self._heap = []
+        self._new_heap = []
+        self._entries = {}  # word -> its live heap entry
+        self._cards = {}    # word -> card dict
+        self._day_counts = {}
+        self._days = []     # sorted days present in _day_counts
+        for card in cards:
+            self._insert(card, push=False)
+        self._rebuild()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _insert(self, card, push=True):
+        word = card['word']
+        old = self._entries.get(word)
+        if old is not None:
+            self._count(old[0], -1)
+        entry = (day_number(card.get('next_review')), card['familiarity'], word)
+        self._entries[word] = entry
+        self._cards[word] = dict(card)
+        self._count(entry[0], 1)
+        if push:
+            heapq.heappush(self._new_heap if entry[0] == 0 else self._heap, entry)
+
+    def _rebuild(self):
+        entries = list(self._entries.values())
+        self._heap = [entry for entry in entries if entry[0]]
+        self._new_heap = [entry for entry in entries if not entry[0]]
+        heapq.heapify(self._heap)
+        heapq.heapify(self._new_heap)
+
+    def _count(self, day, delta):
+        count = self._day_counts.get(day, 0) + delta
+        if count:
+            if day not in self._day_counts:
+                insort(self._days, day)
+            self._day_counts[day] = count
+        else:
+            del self._day_counts[day]
+            self._days.pop(bisect_right(self._days, day) - 1)
+
+    def update(self, cards):
+        """
+        Apply reviewed (or newly added) cards
+
+        Args:
+            cards (iterable): Card dicts with 'word', 'familiarity' and 'next_review'
+        """
+        with self._lock:
+            for card in cards:
+                self._insert(card)
+            # Drop stale entries once they outnumber the live ones
+            if len(self._heap) + len(self._new_heap) > 2 * len(self._entries) + 16:
+                self._rebuild()
+
+    def top(self, today, k=None):
+        """
+        Most urgent due cards: scheduled reviews by earliest due day, then lowest
+        familiarity; then never-scheduled cards by lowest familiarity
+
+        Args:
+            today: Date, 'YYYY-MM-DD' string or day number
+            k (int): Maximum number of cards (None for all due cards)
+
+        Returns:
+            list: Card dicts
+        """
+        today = today if isinstance(today, int) else day_number(today)
+        result = []
+        with self._lock:
+            for heap in (self._heap, self._new_heap):
+                self._walk(heap, today, k, result)
+        return result
+
+    def _walk(self, heap, today, k, result):
+        """Append live due entries of a heap to result in order, up to k in total"""
+        frontier = [(heap[0], 0)] if heap else []
+        while frontier and (k is None or len(result) < k):
+            entry, index = heapq.heappop(frontier)
+            if entry[0] > today:
+                break  # Every remaining node is due later
+            if self._entries.get(entry[2]) is entry:
+                result.append(dict(self._cards[entry[2]]))
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+
+    def count_due(self, today):
+        """
+        Number of cards due on or before a day
+
+        Args:
+            today: Date, 'YYYY-MM-DD' string or day number
+
+        Returns:
+            int: Due card count (cost grows with the number of distinct past due days, not cards)
+        """
+        today = today if isinstance(today, int) else day_number(today)
+        with self._lock:
+            return sum(self._day_counts[day] for day in self._days[:bisect_right(self._days, today)])
+
+    def cards(self):
+        """
+        Snapshot of every card in the index
+
+        Returns:
+            list: Card dicts
+        """
+        with self._lock:
+            return [dict(card) for card in self._cards.values()]
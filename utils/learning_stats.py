@@ -0,0 +1,123 @@
+# Learning Statistics Module
+#
+# Counters of a user's cards by familiarity level (needs review / learning /
+# known), overall and per word bank tag, kept up to date as reviews are
+# applied, so the dashboard reads them without scanning the deck.
+
+import threading
+
+LEVELS = ('needs_review', 'learning', 'known')
+
+def familiarity_level(familiarity):
+    """Level of a familiarity score: needs_review (<= 3), learning (4-6) or known (>= 7)"""
+    if familiarity <= 3:
+        return 'needs_review'
+    if familiarity <= 6:
+        return 'learning'
+    return 'known'
+
+def parse_tags(value):
+    """Tags of a word bank row ('food' or 'food, common'); empty for a missing value"""
+    if not isinstance(value, str):
+        return ()
+    return tuple(dict.fromkeys(tag.strip() for tag in value.split(',') if tag.strip()))
+
+def _empty_counts():
+    return {level: 0 for level in LEVELS}
+
+def _summary(counts):
+    total = sum(counts.values())
+    return {
+        'total_words': total,
+        'needs_review': counts['needs_review'],
+        'learning': counts['learning'],
+        'known': counts['known'],
+        'completion_percentage': (counts['known'] / total * 100) if total > 0 else 0
+    }
+
+class LearningStats:
+    """
+    Level counters for one user's deck, overall and per tag.
+
+    Built once from the user's cards; afterwards apply() moves each reviewed
+    card between levels using its familiarity before and after the review,
+    so reading the totals costs the same whatever the size of the deck.
+    """
+
+    def __init__(self, cards=(), tags_by_word=None):
+        self._lock = threading.Lock()
+        self._tags_by_word = tags_by_word or {}
+        self._levels = {}  # word -> current level
+        self._counts = _empty_counts()
+        self._tag_counts = {}
+        for card in cards:
+            self._move(card['word'], familiarity_level(card['familiarity']))
+
+    def _move(self, word, level):
+        old = self._levels.get(word)
+        if old == level:
+            return
+        tags = self._tags_by_word.get(word, ())
+        if old is not None:
+            self._counts[old] -= 1
+            for tag in tags:
+                self._tag_counts[tag][old] -= 1
+        self._levels[word] = level
+        self._counts[level] += 1
+        for tag in tags:
+            self._tag_counts.setdefault(tag, _empty_counts())[level] += 1
+
+    def apply(self, cards):
+        """
+        Apply reviewed (or newly added) cards
+
+        Args:
+            cards (iterable): Card dicts with 'word' and 'familiarity'
+        """
+        with self._lock:
+            for card in cards:
+                self._move(card['word'], familiarity_level(card['familiarity']))
+
+    def summary(self, by_tag=False):
+        """
+        Current statistics
+
+        Args:
+            by_tag (bool): Also return a breakdown per tag
+
+        Returns:
+            dict: 'total_words', 'needs_review', 'learning', 'known' and
+                  'completion_percentage' (plus 'by_tag': {tag: same keys})
+        """
+        with self._lock:
+            stats = _summary(self._counts)
+            if by_tag:
+                stats['by_tag'] = {tag: _summary(counts) for tag, counts in sorted(self._tag_counts.items())}
+        return stats
+
+def compare_stats(maintained, recomputed):
+    """
+    Differences between maintained and recomputed statistics
+
+    Args:
+        maintained (dict): Statistics from LearningStats.summary(by_tag=True)
+        recomputed (dict): Statistics computed from scratch (same shape)
+
+    Returns:
+        dict: {'total' or tag: {key: (maintained, recomputed)}} for every value that differs
+    """
+    drift = {}
+    pairs = [('total', maintained, recomputed)]
+    tags = set(maintained.get('by_tag', {})) | set(recomputed.get('by_tag', {}))
+    for tag in sorted(tags):
+        pairs.append((tag, maintained.get('by_tag', {}).get(tag, _summary(_empty_counts())),
+                      recomputed.get('by_tag', {}).get(tag, _summary(_empty_counts()))))
+    for name, left, right in pairs:
+        differences = {
+            key: (left[key], right[key])
+            for key in ('total_words',) + LEVELS
+            if left[key] != right[key]
+        }
+        if differences:
+            drift[name] = differences
+    return drift
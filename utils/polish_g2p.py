@@ -0,0 +1,225 @@
+# Polish Grapheme-to-Phoneme Module
+#
+# Rule-based conversion of Polish spelling to phonemes (IPA symbols), so that
+# pronunciation scoring compares sounds rather than spelling: "rz"/"ż" are both
+# /ʐ/, "ó"/"u" are both /u/, "h"/"ch" are both /x/, and final devoicing and
+# voicing assimilation are applied.
+#
+# Reference pronunciations for the word bank and stories are precomputed into a
+# persisted index (python -m utils.polish_g2p), so scoring only looks them up.
+
+import csv
+import json
+import os
+import sys
+from functools import lru_cache
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.text_utils import normalize_text as _normalize, split_sentences
+
+# Bump when the rules change; the index is rebuilt from scratch on a mismatch
+G2P_VERSION = 1
+PHONEME_INDEX_PATH = 'data/phoneme_index.json'
+
+VOWELS = set('aąeęioóuy')
+
+# Softened consonants: spelled with a following "i" before a vowel
+_SOFT_BEFORE_I = {'dz': 'dʑ', 'c': 'tɕ', 's': 'ɕ', 'z': 'ʑ', 'n': 'ɲ'}
+
+# Multi-letter graphemes, longest first
+_DIGRAPHS = [
+    ('dż', 'dʐ'), ('dź', 'dʑ'), ('dz', 'dz'),
+    ('ch', 'x'), ('cz', 'tʂ'), ('sz', 'ʂ'), ('rz', 'ʐ')
+]
+
+_LETTERS = {
+    'a': 'a', 'ą': 'ɔ̃', 'b': 'b', 'c': 'ts', 'ć': 'tɕ', 'd': 'd', 'e': 'ɛ', 'ę': 'ɛ̃',
+    'f': 'f', 'g': 'g', 'h': 'x', 'i': 'i', 'j': 'j', 'k': 'k', 'l': 'l', 'ł': 'w',
+    'm': 'm', 'n': 'n', 'ń': 'ɲ', 'o': 'ɔ', 'ó': 'u', 'p': 'p', 'r': 'r', 's': 's',
+    'ś': 'ɕ', 't': 't', 'u': 'u', 'w': 'v', 'y': 'ɨ', 'z': 'z', 'ź': 'ʑ', 'ż': 'ʐ'
+}
+
+_DEVOICE = {
+    'b': 'p', 'd': 't', 'g': 'k', 'v': 'f', 'z': 's', 'ʐ': 'ʂ', 'ʑ': 'ɕ',
+    'dz': 'ts', 'dʐ': 'tʂ', 'dʑ': 'tɕ'
+}
+_VOICELESS = {'p', 't', 'k', 'f', 's', 'ʂ', 'ɕ', 'x', 'ts', 'tʂ', 'tɕ'}
+
+def _spell_to_phonemes(word):
+    """Map letters to phonemes before any assimilation"""
+    phonemes = []
+    i = 0
+    while i < len(word):
+        # Soft consonant + i + vowel: the "i" only marks softness
+        matched = False
+        for spelling, phoneme in _SOFT_BEFORE_I.items():
+            end = i + len(spelling)
+            if word.startswith(spelling, i) and word[end:end + 1] == 'i':
+                phonemes.append(phoneme)
+                if end + 1 < len(word) and word[end + 1] in VOWELS:
+                    i = end + 1
+                else:
+                    phonemes.append('i')
+                    i = end + 1
+                matched = True
+                break
+        if matched:
+            continue
+        for spelling, phoneme in _DIGRAPHS:
+            if word.startswith(spelling, i):
+                phonemes.append(phoneme)
+                i += len(spelling)
+                break
+        else:
+            letter = word[i]
+            # Other consonant + i + vowel: the "i" is a glide
+            if letter == 'i' and 0 < i < len(word) - 1 and word[i - 1] not in VOWELS and word[i + 1] in VOWELS:
+                phonemes.append('j')
+            elif letter in _LETTERS:
+                phonemes.append(_LETTERS[letter])
+            i += 1
+    return phonemes
+
+@lru_cache(maxsize=8192)
+def word_to_phonemes(word):
+    """
+    Convert one Polish word to phonemes
+
+    Args:
+        word (str): Word (any case; punctuation is ignored)
+
+    Returns:
+        tuple: Phoneme symbols
+    """
+    phonemes = _spell_to_phonemes(_normalize(word).replace(' ', ''))
+    if not phonemes:
+        return ()
+    # Word-final devoicing; final "ę" loses its nasality
+    if phonemes[-1] in _DEVOICE:
+        phonemes[-1] = _DEVOICE[phonemes[-1]]
+    elif phonemes[-1] == 'ɛ̃':
+        phonemes[-1] = 'ɛ'
+    # Regressive voicing assimilation, right to left: "wtorek" -> /ftɔrɛk/
+    for i in range(len(phonemes) - 2, -1, -1):
+        if phonemes[i] in _DEVOICE and phonemes[i + 1] in _VOICELESS:
+            phonemes[i] = _DEVOICE[phonemes[i]]
+    # Progressive devoicing of "w" and "rz" after a voiceless consonant: "przed", "kwiat"
+    for i in range(1, len(phonemes)):
+        if phonemes[i] in ('v', 'ʐ') and phonemes[i - 1] in _VOICELESS:
+            phonemes[i] = _DEVOICE[phonemes[i]]
+    return tuple(phonemes)
+
+def text_to_phonemes(text):
+    """
+    Convert a Polish phrase to a flat phoneme sequence (words separated by ' ')
+
+    Args:
+        text (str): Phrase or sentence
+
+    Returns:
+        tuple: Phoneme symbols with ' ' between words
+    """
+    phonemes = []
+    for word in _normalize(text).split():
+        if phonemes:
+            phonemes.append(' ')
+        phonemes.extend(word_to_phonemes(word))
+    return tuple(phonemes)
+
+def collect_index_texts(word_bank_path='data/word_bank.csv', stories_path='data/stories.csv'):
+    """
+    Collect every reference text to index: words, example sentences and story sentences
+
+    Returns:
+        set: Normalized texts (phrases and each of their words)
+    """
+    texts = set()
+    if os.path.exists(word_bank_path):
+        with open(word_bank_path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                for column in ('word', 'example'):
+                    if row.get(column):
+                        texts.add(_normalize(row[column]))
+    if os.path.exists(stories_path):
+        with open(stories_path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                for sentence in split_sentences(row.get('content') or ''):
+                    texts.add(_normalize(sentence))
+    for text in list(texts):
+        texts.update(text.split())
+    texts.discard('')
+    return texts
+
+def build_phoneme_index(word_bank_path='data/word_bank.csv', stories_path='data/stories.csv',
+                        index_path=PHONEME_INDEX_PATH):
+    """
+    Build or incrementally update the persisted phoneme index
+
+    Only texts missing from the index are converted; entries no longer in the
+    corpus are dropped. A G2P_VERSION change rebuilds everything.
+
+    Returns:
+        dict: Counts of added, kept and removed entries
+    """
+    index = _read_index(index_path)
+    entries = index['entries'] if index.get('version') == G2P_VERSION else {}
+    wanted = collect_index_texts(word_bank_path, stories_path)
+    summary = {'added': 0, 'kept': 0, 'removed': len(set(entries) - wanted)}
+    new_entries = {}
+    for text in sorted(wanted):
+        if text in entries:
+            new_entries[text] = entries[text]
+            summary['kept'] += 1
+        else:
+            new_entries[text] = list(text_to_phonemes(text))
+            summary['added'] += 1
+    if not summary['added'] and not summary['removed'] and index.get('version') == G2P_VERSION:
+        return summary
+    temp_path = index_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': G2P_VERSION, 'entries': new_entries}, f, ensure_ascii=False)
+    os.replace(temp_path, index_path)
+    _index_cache.pop(index_path, None)
+    return summary
+
+def _read_index(index_path):
+    if not os.path.exists(index_path):
+        return {'version': None, 'entries': {}}
+    with open(index_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+# In-memory copy of the index, re-read only when the file changes
+_index_cache = {}
+
+def _load_index(index_path):
+    try:
+        mtime = os.path.getmtime(index_path)
+    except OSError:
+        return {}
+    cached = _index_cache.get(index_path)
+    if cached is None or cached[0] != mtime:
+        index = _read_index(index_path)
+        entries = index['entries'] if index.get('version') == G2P_VERSION else {}
+        cached = (mtime, {text: tuple(value) for text, value in entries.items()})
+        _index_cache[index_path] = cached
+    return cached[1]
+
+def get_reference_phonemes(text, index_path=PHONEME_INDEX_PATH):
+    """
+    Phonemes of a reference text: an index lookup, converted on the fly if missing
+
+    Args:
+        text (str): Word, example sentence or story sentence
+        index_path (str): Path to the phoneme index
+
+    Returns:
+        tuple: Phoneme symbols with ' ' between words
+    """
+    phonemes = _load_index(index_path).get(_normalize(text))
+    if phonemes is None:
+        return text_to_phonemes(text)
+    return phonemes
+
+if __name__ == '__main__':
+    result = build_phoneme_index()
+    print(f"Phoneme index: {result['added']} added, {result['kept']} kept, {result['removed']} removed")
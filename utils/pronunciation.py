@@ -3,39 +3,35 @@
 import speech_recognition as sr
 import tempfile
 import os
-from difflib import SequenceMatcher
-import re
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '.')))
 from utils import voice_io
+from utils.similarity import normalized_similarity, align_words, alignment_score
+from utils.polish_g2p import get_reference_phonemes, text_to_phonemes, word_to_phonemes
+from utils.pronunciation_tips import tip_annotator, tips_for_spans
+from utils.text_utils import normalize_text
+from utils import prosody
 
-def analyze_pronunciation(audio_file, expected_text):
+def analyze_pronunciation(audio_file, expected_text, model_path=voice_io.DEFAULT_VOSK_MODEL_PATH):
     """
     Analyze pronunciation by comparing spoken text with expected text
     
     Args:
-        audio_file (str): Path to audio file
+        audio_file: Recorded WAV bytes or path to audio file
         expected_text (str): Expected text to be spoken
+        model_path (str): Path to the Vosk model directory
     
     Returns:
         dict: Analysis result with transcription and similarity score
     """
     try:
-        # Use Vosk-based transcription from voice_io
-        transcribed_text = voice_io.transcribe_audio(audio_file)
-        if not transcribed_text or 'error' in transcribed_text.lower():
-            return {
-                'transcribed_text': '',
-                'similarity_score': 0,
-                'error': transcribed_text if transcribed_text else 'Could not understand audio'
-            }
-        # Calculate similarity score
-        similarity_score = calculate_similarity(expected_text, transcribed_text)
-        return {
-            'transcribed_text': transcribed_text,
-            'similarity_score': similarity_score,
-            'error': None
-        }
+        # Successful analyses are memoized per recording, so Streamlit reruns reuse them
+        return voice_io.cached_audio_result(
+            'analysis', audio_file, (expected_text, model_path),
+            lambda: _analyze_pronunciation(audio_file, expected_text, model_path)
+        )
+    except _AnalysisError as e:
+        return e.result
     except Exception as e:
         return {
             'transcribed_text': '',
@@ -43,6 +39,68 @@ def analyze_pronunciation(audio_file, expected_text):
             'error': f'Audio analysis error: {e}'
         }
 
+class _AnalysisError(Exception):
+    """Carries a failed analysis result past the cache so it is not memoized"""
+
+    def __init__(self, result):
+        super().__init__(result['error'])
+        self.result = result
+
+# Share of a word's score that comes from the recognizer's confidence in it
+CONFIDENCE_WEIGHT = 0.3
+# Timing thresholds for the detailed feedback
+HESITATION_SECONDS = 0.6
+SLOW_SECONDS_PER_PHONEME = 0.2
+UNCLEAR_CONFIDENCE = 0.6
+
+def _analyze_pronunciation(audio_file, expected_text, model_path):
+    # One constrained decode gives the words together with their timings and confidences
+    try:
+        transcript = voice_io.transcribe_audio_detailed(audio_file, expected_text, model_path)
+    except Exception as e:
+        raise _AnalysisError({
+            'transcribed_text': '',
+            'similarity_score': 0,
+            'error': f"Vosk transcription error: {e}"
+        })
+    transcribed_text = transcript['text']
+    if not transcribed_text:
+        raise _AnalysisError({
+            'transcribed_text': '',
+            'similarity_score': 0,
+            'error': 'Could not understand audio'
+        })
+    # Align once; the aggregate score and the detailed feedback both reuse it
+    alignment = align_pronunciation(expected_text, transcribed_text)
+    _apply_word_timings(alignment, transcript)
+    return {
+        'transcribed_text': transcribed_text,
+        'similarity_score': alignment_score(alignment),
+        'alignment': alignment,
+        'error': None
+    }
+
+def _apply_word_timings(alignment, transcript):
+    """
+    Attach Vosk word timings to the alignment and weight scores by confidence
+
+    Adds 'start', 'end' and 'confidence' to every op with a transcribed word.
+    Timings are only used when the recognizer's words line up one-to-one with
+    the normalized transcript.
+    """
+    timings = transcript['timings']
+    if len(timings) != len(normalize_text(transcript['text']).split()):
+        return
+    for op in alignment:
+        index = op.get('transcribed_index')
+        if index is None:
+            continue
+        start, end, confidence = (float(value) for value in timings[index])
+        op['start'] = start
+        op['end'] = end
+        op['confidence'] = confidence
+        op['score'] *= (1 - CONFIDENCE_WEIGHT) + CONFIDENCE_WEIGHT * confidence
+
 def calculate_similarity(expected, actual):
     """
     Calculate similarity between expected and actual text
@@ -54,37 +112,35 @@ def calculate_similarity(expected, actual):
     Returns:
         float: Similarity score (0-100)
     """
-    # Normalize texts
-    expected_clean = normalize_text(expected)
-    actual_clean = normalize_text(actual)
+    # Compare pronunciations: the reference comes from the precomputed phoneme index
+    expected_phonemes = get_reference_phonemes(expected)
+    actual_phonemes = text_to_phonemes(normalize_text(actual))
     
-    # Calculate sequence similarity
-    similarity = SequenceMatcher(None, expected_clean, actual_clean).ratio()
+    # Phoneme-level edit-distance similarity
+    similarity = normalized_similarity(expected_phonemes, actual_phonemes)
     
     # Convert to percentage
     return similarity * 100
 
-def normalize_text(text):
+def align_pronunciation(expected_text, transcribed_text):
     """
-    Normalize text for comparison
+    Align expected and transcribed words (see similarity.align_words)
     
     Args:
-        text (str): Text to normalize
+        expected_text (str): Expected text
+        transcribed_text (str): Transcribed text
     
     Returns:
-        str: Normalized text
+        list: Alignment ops with per-word scores (0-100)
     """
-    # Convert to lowercase
-    text = text.lower()
-    
-    # Remove punctuation and extra spaces
-    text = re.sub(r'[^\w\s]', '', text)
-    text = re.sub(r'\s+', ' ', text)
-    
-    # Strip whitespace
-    text = text.strip()
-    
-    return text
+    expected_words = normalize_text(expected_text).split()
+    transcribed_words = normalize_text(transcribed_text).split()
+    # Words are compared by sound, so spelling homophones ("rz"/"ż", "ó"/"u") match
+    return align_words(
+        expected_words, transcribed_words,
+        expected_keys=[get_reference_phonemes(word) for word in expected_words],
+        transcribed_keys=[word_to_phonemes(word) for word in transcribed_words]
+    )
 
 def get_pronunciation_score(analysis_result):
     """
@@ -132,44 +188,59 @@ def get_pronunciation_score(analysis_result):
         'transcribed': transcribed
     }
 
-def get_detailed_feedback(expected_text, transcribed_text):
+def get_detailed_feedback(expected_text, transcribed_text, alignment=None):
     """
     Get detailed feedback comparing expected and transcribed text
     
     Args:
         expected_text (str): Expected text
         transcribed_text (str): Transcribed text
+        alignment (list): Alignment from analyze_pronunciation, computed here if omitted
     
     Returns:
         dict: Detailed feedback
     """
-    expected_words = normalize_text(expected_text).split()
-    transcribed_words = normalize_text(transcribed_text).split()
+    if alignment is None:
+        alignment = align_pronunciation(expected_text, transcribed_text)
     
     feedback = {
         'word_accuracy': [],
         'missing_words': [],
         'extra_words': [],
-        'suggestions': []
+        'suggestions': [],
+        'alignment': alignment
     }
     
-    # Check word-by-word accuracy
-    for i, expected_word in enumerate(expected_words):
-        if i < len(transcribed_words):
-            transcribed_word = transcribed_words[i]
-            word_similarity = SequenceMatcher(None, expected_word, transcribed_word).ratio()
-            
+    # Words are compared along the optimal alignment, so one dropped word
+    # does not shift every following word out of place
+    for op in alignment:
+        if op['op'] in ('match', 'substitute'):
             feedback['word_accuracy'].append({
-                'expected': expected_word,
-                'transcribed': transcribed_word,
-                'accuracy': word_similarity * 100
+                'expected': op['expected'],
+                'transcribed': op['transcribed'],
+                'accuracy': op['score']
             })
+        elif op['op'] == 'delete':
+            feedback['missing_words'].append(op['expected'])
         else:
-            feedback['missing_words'].append(expected_word)
-    
-    # Check for extra words
-    if len(transcribed_words) > len(expected_words):
-        feedback['extra_words'] = transcribed_words[len(expected_words):]
+            feedback['extra_words'].append(op['transcribed'])
+    
+    # Timing feedback from the recognizer's word boundaries, when available
+    feedback['hesitations'] = []
+    feedback['slow_words'] = []
+    feedback['unclear_words'] = []
+    previous_end = None
+    for op in alignment:
+        if 'start' not in op:
+            continue
+        if previous_end is not None and op['start'] - previous_end > HESITATION_SECONDS:
+            feedback['hesitations'].append({'before': op['transcribed'], 'pause': op['start'] - previous_end})
+        previous_end = op['end']
+        phoneme_count = max(len(word_to_phonemes(op['transcribed'])), 1)
+        if (op['end'] - op['start']) / phoneme_count > SLOW_SECONDS_PER_PHONEME:
+            feedback['slow_words'].append(op['transcribed'])
+        if op['confidence'] < UNCLEAR_CONFIDENCE:
+            feedback['unclear_words'].append(op['transcribed'])
     
     # Generate suggestions
     if feedback['missing_words']:
@@ -181,22 +252,70 @@ def get_detailed_feedback(expected_text, transcribed_text):
     if feedback['extra_words']:
         feedback['suggestions'].append("Be careful not to add extra words.")
     
+    if feedback['hesitations']:
+        feedback['suggestions'].append("Try to say the phrase in one smooth breath, without long pauses.")
+    
+    if feedback['slow_words']:
+        feedback['suggestions'].append(f"Say these words a little faster: {', '.join(feedback['slow_words'])}")
+    
+    if feedback['unclear_words']:
+        feedback['suggestions'].append(f"These words were hard to recognize: {', '.join(feedback['unclear_words'])}")
+    
     return feedback
 
+def analyze_prosody(audio_file, expected_text):
+    """
+    Check word stress and intonation of a recording
+    
+    Args:
+        audio_file: Recorded WAV bytes or path to audio file
+        expected_text (str): Expected text (its punctuation marks questions)
+    
+    Returns:
+        dict: {'stress': per-word stress checks, 'intonation': pitch summary or None,
+               'suggestions': list of str}, or None if the recording cannot be analyzed
+    """
+    try:
+        return voice_io.cached_audio_result(
+            'prosody', audio_file, (expected_text,),
+            lambda: _analyze_prosody(audio_file, expected_text)
+        )
+    except Exception as e:
+        print(f"Error analyzing prosody: {e}")
+        return None
+
+def _analyze_prosody(audio_file, expected_text):
+    # Analyze the same preprocessed signal the recognizer saw, so word timings line up
+    transcript = voice_io.transcribe_audio_detailed(audio_file, expected_text)
+    params, pcm = voice_io.load_audio(audio_file)
+    samples = voice_io.preprocess_audio(params, pcm)
+    features = prosody.extract_prosody(samples, voice_io.VOSK_SAMPLE_RATE)
+    stress = prosody.check_word_stress(features, transcript['words'], transcript['timings'])
+    intonation = prosody.intonation_summary(features)
+    return {
+        'stress': stress,
+        'intonation': intonation,
+        'suggestions': prosody.prosody_feedback(stress, intonation, expected_text.strip().endswith('?'),
+                                                len(expected_text.split()))
+    }
+
 def practice_word_pronunciation(word, audio_file):
     """
     Practice pronunciation of a specific word
     
     Args:
         word (str): Word to practice
-        audio_file (str): Path to recorded audio
+        audio_file: Recorded WAV bytes or path to audio file
     
     Returns:
         dict: Practice result with detailed feedback
     """
     analysis = analyze_pronunciation(audio_file, word)
     score_result = get_pronunciation_score(analysis)
-    detailed_feedback = get_detailed_feedback(word, analysis.get('transcribed_text', ''))
+    detailed_feedback = get_detailed_feedback(word, analysis.get('transcribed_text', ''), analysis.get('alignment'))
+    prosody_result = analyze_prosody(audio_file, word) if not analysis.get('error') else None
+    if prosody_result:
+        detailed_feedback['suggestions'].extend(prosody_result['suggestions'])
     
     return {
         'word': word,
@@ -204,7 +323,8 @@ def practice_word_pronunciation(word, audio_file):
         'score': score_result['score'],
         'feedback': score_result['feedback'],
         'level': score_result['level'],
-        'detailed_feedback': detailed_feedback
+        'detailed_feedback': detailed_feedback,
+        'prosody': prosody_result
     }
 
 def get_pronunciation_tips(word, language='polish'):
@@ -218,30 +338,8 @@ def get_pronunciation_tips(word, language='polish'):
     Returns:
         list: List of pronunciation tips
     """
-    # Basic Polish pronunciation tips
-    polish_tips = {
-        'ą': "Pronounce 'ą' like 'on' in French 'bon'",
-        'ę': "Pronounce 'ę' like 'en' in French 'vent'",
-        'ć': "Pronounce 'ć' like 'ch' in 'cheap' but softer",
-        'ł': "Pronounce 'ł' like 'w' in 'water'",
-        'ń': "Pronounce 'ń' like 'ny' in 'canyon'",
-        'ś': "Pronounce 'ś' like 'sh' in 'sheep' but softer",
-        'ź': "Pronounce 'ź' like 'z' but softer",
-        'ż': "Pronounce 'ż' like 's' in 'measure'",
-        'sz': "Pronounce 'sz' like 'sh' in 'shop'",
-        'cz': "Pronounce 'cz' like 'ch' in 'church'",
-        'rz': "Pronounce 'rz' like 'zh' sound",
-        'dz': "Pronounce 'dz' like 'ds' in 'woods'",
-        'dż': "Pronounce 'dż' like 'j' in 'judge'",
-        'dź': "Pronounce 'dź' like soft 'j'"
-    }
-    
-    tips = []
-    word_lower = word.lower()
-    
-    for pattern, tip in polish_tips.items():
-        if pattern in word_lower:
-            tips.append(tip)
+    # One pass of the precompiled matcher finds every tricky sound in the word
+    tips = tips_for_spans(tip_annotator.annotate(word))
     
     # General tips
     if not tips:
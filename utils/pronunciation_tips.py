@@ -0,0 +1,192 @@
+# Pronunciation Tip Annotator Module
+#
+# Finds the tricky Polish sounds (digraphs and diacritics) in a word, a whole
+# story or the entire word bank with one Aho-Corasick pass over the text, and
+# reports them as character spans so pages can highlight them.
+
+import hashlib
+import threading
+from collections import OrderedDict, deque
+
+POLISH_TIPS = {
+    'ą': "Pronounce 'ą' like 'on' in French 'bon'",
+    'ę': "Pronounce 'ę' like 'en' in French 'vent'",
+    'ć': "Pronounce 'ć' like 'ch' in 'cheap' but softer",
+    'ł': "Pronounce 'ł' like 'w' in 'water'",
+    'ń': "Pronounce 'ń' like 'ny' in 'canyon'",
+    'ś': "Pronounce 'ś' like 'sh' in 'sheep' but softer",
+    'ź': "Pronounce 'ź' like 'z' but softer",
+    'ż': "Pronounce 'ż' like 's' in 'measure'",
+    'sz': "Pronounce 'sz' like 'sh' in 'shop'",
+    'cz': "Pronounce 'cz' like 'ch' in 'church'",
+    'rz': "Pronounce 'rz' like 'zh' sound",
+    'dz': "Pronounce 'dz' like 'ds' in 'woods'",
+    'dż': "Pronounce 'dż' like 'j' in 'judge'",
+    'dź': "Pronounce 'dź' like soft 'j'"
+}
+
+# Bump when the patterns or matching rules change so cached annotations are dropped
+ANNOTATOR_VERSION = 1
+ANNOTATION_CACHE_SIZE = 1024
+
+class TipAnnotator:
+    """
+    Multi-pattern matcher for pronunciation tips.
+
+    The patterns are compiled once into an Aho-Corasick automaton, so annotating
+    a text costs one pass over its characters no matter how many patterns there
+    are. Matching is case-insensitive and spans refer to the original text. Where
+    patterns overlap ("dż" contains "ż") the leftmost, then longest, match wins,
+    so every character belongs to at most one span.
+    """
+
+    def __init__(self, tips=POLISH_TIPS, cache_size=ANNOTATION_CACHE_SIZE):
+        self.tips = dict(tips)
+        self.cache_size = cache_size
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]  # state -> lengths of the patterns ending there
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        for pattern in self.tips:
+            self._add_pattern(pattern.lower())
+        self._build_failure_links()
+
+    def _add_pattern(self, pattern):
+        state = 0
+        for symbol in pattern:
+            if symbol not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+                self._goto[state][symbol] = len(self._goto) - 1
+            state = self._goto[state][symbol]
+        self._output[state] = (len(pattern),)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for symbol, child in self._goto[state].items():
+                queue.append(child)
+                if state:
+                    fallback = self._fail[state]
+                    while fallback and symbol not in self._goto[fallback]:
+                        fallback = self._fail[fallback]
+                    self._fail[child] = self._goto[fallback].get(symbol, 0)
+                # Longest pattern first, so the leftmost-longest pick is a lookup
+                self._output[child] = tuple(sorted(self._output[child] + self._output[self._fail[child]], reverse=True))
+
+    def _scan(self, text):
+        """Every pattern occurrence as (start, end), in order of end position"""
+        matches = []
+        state = 0
+        for index, char in enumerate(text):
+            symbol = char.lower()
+            while state and symbol not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(symbol, 0)
+            for length in self._output[state]:
+                matches.append((index + 1 - length, index + 1))
+        return matches
+
+    def _compute(self, text):
+        # Leftmost-longest: sort by start, longest first, then skip overlaps
+        spans = []
+        covered = 0
+        for start, end in sorted(self._scan(text), key=lambda span: (span[0], -span[1])):
+            if start < covered:
+                continue
+            pattern = text[start:end].lower()
+            spans.append({'start': start, 'end': end, 'pattern': pattern, 'tip': self.tips[pattern]})
+            covered = end
+        return tuple(spans)
+
+    def annotate(self, text):
+        """
+        Find the tricky sounds in a text
+
+        Args:
+            text (str): Word, sentence or whole passage
+
+        Returns:
+            tuple: Spans in order, each {'start': int, 'end': int, 'pattern': str, 'tip': str};
+                   memoized by content hash
+        """
+        text = str(text)
+        key = (hashlib.sha256(text.encode('utf-8')).hexdigest(), ANNOTATOR_VERSION)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        spans = self._compute(text)
+        with self._lock:
+            self._cache[key] = spans
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return spans
+
+    def annotate_many(self, texts):
+        """
+        Annotate many texts (e.g. every word in the word bank)
+
+        Args:
+            texts (iterable): Texts to annotate
+
+        Returns:
+            list: Spans for each text, in order (see annotate)
+        """
+        return [self.annotate(text) for text in texts]
+
+    def stats(self):
+        """
+        Get automaton and cache size
+
+        Returns:
+            dict: Number of patterns, automaton states and cached annotations
+        """
+        with self._lock:
+            cached = len(self._cache)
+        return {'patterns': len(self.tips), 'states': len(self._goto), 'cached': cached}
+
+tip_annotator = TipAnnotator()
+
+def tips_for_spans(spans):
+    """
+    Distinct tips for a set of spans, in order of first appearance
+
+    Args:
+        spans (iterable): Spans from TipAnnotator.annotate
+
+    Returns:
+        list: Tip strings
+    """
+    tips = []
+    for span in spans:
+        if span['tip'] not in tips:
+            tips.append(span['tip'])
+    return tips
+
+def highlight_markdown(text, spans=None, color='orange'):
+    """
+    Mark the tricky sounds in a text with Streamlit's colored-text markdown
+
+    Args:
+        text (str): Text to highlight
+        spans (tuple): Spans from TipAnnotator.annotate (computed if omitted)
+        color (str): Streamlit text color
+
+    Returns:
+        str: Markdown with every span wrapped as :color[...]
+    """
+    text = str(text)
+    if spans is None:
+        spans = tip_annotator.annotate(text)
+    parts = []
+    position = 0
+    for span in spans:
+        parts.append(text[position:span['start']])
+        parts.append(f":{color}[{text[span['start']:span['end']]}]")
+        position = span['end']
+    parts.append(text[position:])
+    return ''.join(parts)
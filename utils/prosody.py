@@ -0,0 +1,252 @@
+# Prosody Analysis Module
+#
+# Frame-level energy, pitch (F0) and voicing for a recording, computed for all
+# frames at once with NumPy: frames are strided views of the signal and their
+# autocorrelations come from one batched FFT. Combined with the recognizer's
+# word timings this checks Polish word stress (almost always on the penultimate
+# syllable) and sentence intonation.
+#
+# Run `python -m utils.prosody` to measure the real-time factor.
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.polish_g2p import word_to_phonemes
+
+FRAME_MS = 40
+HOP_MS = 10
+MIN_F0 = 75.0
+MAX_F0 = 400.0
+# Normalized autocorrelation peak above which a frame counts as voiced
+VOICING_THRESHOLD = 0.45
+# A shorter-lag peak within this fraction of the highest one is preferred
+OCTAVE_TOLERANCE = 0.85
+# Frames quieter than this (relative to the loudest frame) are never voiced
+SILENCE_DB = -40.0
+# The contour is only judged for phrases of this many words, or with this much
+# voiced speech (frames); a short single word is naturally flat
+MIN_INTONATION_WORDS = 2
+MIN_INTONATION_VOICED_FRAMES = 100
+
+SYLLABLE_NUCLEI = {'a', 'ɛ', 'i', 'ɔ', 'u', 'ɨ', 'ɔ̃', 'ɛ̃'}
+
+def frame_signal(signal, frame_len, hop):
+    """
+    Split a signal into overlapping frames (a strided view, no copy)
+
+    Args:
+        signal (np.ndarray): Mono samples
+        frame_len (int): Samples per frame
+        hop (int): Samples between frame starts
+
+    Returns:
+        np.ndarray: Frames of shape (n_frames, frame_len)
+    """
+    if len(signal) < frame_len:
+        signal = np.pad(signal, (0, frame_len - len(signal)))
+    return np.lib.stride_tricks.sliding_window_view(signal, frame_len)[::hop]
+
+def extract_prosody(signal, sample_rate, frame_ms=FRAME_MS, hop_ms=HOP_MS, min_f0=MIN_F0, max_f0=MAX_F0):
+    """
+    Energy, pitch and voicing contours of a recording
+
+    Args:
+        signal (np.ndarray): Mono samples (float in [-1, 1] or 16-bit integers)
+        sample_rate (int): Sample rate of the signal
+        frame_ms (int): Analysis window in milliseconds
+        hop_ms (int): Frame step in milliseconds
+        min_f0 (float): Lowest pitch searched, in Hz
+        max_f0 (float): Highest pitch searched, in Hz
+
+    Returns:
+        dict: {'times': frame centres (s), 'energy_db': frame level (dBFS),
+               'f0': pitch in Hz (0 where unvoiced), 'voiced': bool array}
+    """
+    signal = np.asarray(signal)
+    if signal.dtype.kind in 'iu':
+        signal = signal.astype(np.float32) / 32768.0
+    frame_len = int(sample_rate * frame_ms / 1000)
+    hop = int(sample_rate * hop_ms / 1000)
+    frames = frame_signal(signal.astype(np.float32), frame_len, hop)
+    frames = frames - frames.mean(axis=1, keepdims=True)
+
+    energy_db = 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-12)
+
+    # Autocorrelation of every frame: |FFT|^2 with zero padding, one batched transform
+    windowed = frames * np.hanning(frame_len).astype(np.float32)
+    n_fft = 1 << int(np.ceil(np.log2(2 * frame_len)))
+    spectrum = np.fft.rfft(windowed, n_fft, axis=1)
+    autocorr = np.fft.irfft(spectrum.real ** 2 + spectrum.imag ** 2, n_fft, axis=1)[:, :frame_len]
+    # Divide out the window's own autocorrelation so long lags are not penalized
+    window_autocorr = np.correlate(np.hanning(frame_len), np.hanning(frame_len), 'full')[frame_len - 1:]
+    autocorr = autocorr / np.maximum(window_autocorr, 1e-3)
+    autocorr = autocorr / np.maximum(autocorr[:, :1], 1e-12)
+
+    min_lag = max(1, int(sample_rate / max_f0))
+    max_lag = min(frame_len - 2, int(sample_rate / min_f0))
+    search = autocorr[:, min_lag - 1:max_lag + 2]
+    # Take the shortest-lag local maximum close to the best one; the multiples of
+    # the true period score almost as high and would halve the pitch
+    inner = search[:, 1:-1]
+    local_max = (inner >= search[:, :-2]) & (inner >= search[:, 2:])
+    candidates = local_max & (inner >= OCTAVE_TOLERANCE * inner.max(axis=1, keepdims=True))
+    best = np.argmax(candidates, axis=1)
+    peak = inner[np.arange(len(inner)), best]
+    lag = best + min_lag
+
+    # Parabolic interpolation around the peak for sub-sample lag precision
+    rows = np.arange(len(autocorr))
+    left = autocorr[rows, np.clip(lag - 1, 0, frame_len - 1)]
+    right = autocorr[rows, np.clip(lag + 1, 0, frame_len - 1)]
+    denominator = left - 2 * peak + right
+    shift = np.where(np.abs(denominator) > 1e-9, 0.5 * (left - right) / np.where(denominator == 0, 1, denominator), 0.0)
+    precise_lag = lag + np.clip(shift, -0.5, 0.5)
+
+    voiced = (peak > VOICING_THRESHOLD) & (energy_db > energy_db.max() + SILENCE_DB)
+    f0 = np.where(voiced, sample_rate / precise_lag, 0.0).astype(np.float32)
+    times = (np.arange(len(frames)) * hop + frame_len / 2) / sample_rate
+    return {'times': times, 'energy_db': energy_db.astype(np.float32), 'f0': f0, 'voiced': voiced}
+
+def count_syllables(word):
+    """Number of syllables in a Polish word (its vowel nuclei)"""
+    return sum(1 for phoneme in word_to_phonemes(word) if phoneme in SYLLABLE_NUCLEI)
+
+def _syllable_prominence(features, start, end, n_syllables):
+    """
+    Prominence of each syllable of a word spoken between start and end
+
+    Without phone-level timings the word is split into equal-length syllables.
+    Prominence combines loudness (dB) with pitch in semitones, both relative
+    to the word itself.
+    """
+    times = features['times']
+    mask = (times >= start) & (times < end)
+    if mask.sum() < n_syllables:
+        return None
+    energy = features['energy_db'][mask]
+    f0 = features['f0'][mask]
+    slot = np.minimum(((times[mask] - start) / (end - start) * n_syllables).astype(int), n_syllables - 1)
+    counts = np.bincount(slot, minlength=n_syllables)
+    if np.any(counts == 0):
+        return None
+    loudness = np.bincount(slot, weights=energy, minlength=n_syllables) / counts
+    voiced = f0 > 0
+    semitones = np.zeros_like(f0)
+    if voiced.any():
+        semitones[voiced] = 12.0 * np.log2(f0[voiced] / np.median(f0[voiced]))
+    voiced_counts = np.bincount(slot, weights=voiced, minlength=n_syllables)
+    pitch = np.bincount(slot, weights=semitones, minlength=n_syllables) / np.maximum(voiced_counts, 1)
+    return (loudness - loudness.mean()) + pitch
+
+def check_word_stress(features, words, timings):
+    """
+    Check that each multi-syllable word is stressed on its penultimate syllable
+
+    Args:
+        features (dict): Output of extract_prosody
+        words (sequence): Recognized words
+        timings (np.ndarray): Word timings, rows of (start, end, confidence)
+
+    Returns:
+        list: For each checked word {'word', 'syllables', 'expected_syllable',
+              'stressed_syllable', 'correct'} (syllables counted from 1)
+    """
+    results = []
+    for word, (start, end, _) in zip(words, timings):
+        n_syllables = count_syllables(word)
+        if n_syllables < 2 or end <= start:
+            continue
+        prominence = _syllable_prominence(features, start, end, n_syllables)
+        if prominence is None:
+            continue
+        stressed = int(np.argmax(prominence)) + 1
+        results.append({
+            'word': word,
+            'syllables': n_syllables,
+            'expected_syllable': n_syllables - 1,
+            'stressed_syllable': stressed,
+            'correct': stressed == n_syllables - 1
+        })
+    return results
+
+def intonation_summary(features, tail_seconds=0.5):
+    """
+    Describe the pitch contour of an utterance
+
+    Args:
+        features (dict): Output of extract_prosody
+        tail_seconds (float): Length of the final stretch used for the ending slope
+
+    Returns:
+        dict: {'pitch_range': semitones between the 10th and 90th percentile,
+               'final_slope': semitones per second over the last voiced stretch,
+               'voiced_frames': number of voiced frames}
+              or None if too little of the recording is voiced
+    """
+    voiced = features['voiced']
+    if voiced.sum() < 5:
+        return None
+    f0 = features['f0'][voiced]
+    times = features['times'][voiced]
+    semitones = 12.0 * np.log2(f0 / np.median(f0))
+    low, high = np.percentile(semitones, [10, 90])
+    tail = times >= times[-1] - tail_seconds
+    slope = 0.0
+    if tail.sum() >= 3 and np.ptp(times[tail]) > 0:
+        slope = float(np.polyfit(times[tail], semitones[tail], 1)[0])
+    return {'pitch_range': float(high - low), 'final_slope': slope, 'voiced_frames': int(voiced.sum())}
+
+def prosody_feedback(stress, intonation, is_question=False, n_words=1):
+    """
+    Turn stress and intonation results into learner-facing suggestions
+
+    Args:
+        stress (list): Output of check_word_stress
+        intonation (dict): Output of intonation_summary (or None)
+        is_question (bool): Whether the phrase is a question
+        n_words (int): Number of words in the expected phrase
+
+    Returns:
+        list: Suggestions (empty when nothing stands out)
+    """
+    suggestions = []
+    for item in stress:
+        if not item['correct']:
+            suggestions.append(
+                f"Stress '{item['word']}' on syllable {item['expected_syllable']} of {item['syllables']} "
+                f"(you stressed syllable {item['stressed_syllable']})."
+            )
+    if intonation and (n_words >= MIN_INTONATION_WORDS
+                       or intonation['voiced_frames'] >= MIN_INTONATION_VOICED_FRAMES):
+        if intonation['pitch_range'] < 2.0:
+            suggestions.append("Your pitch stays very flat; let your voice rise and fall a little more.")
+        if is_question and intonation['final_slope'] < 0:
+            suggestions.append("For a yes/no question, let your voice rise at the end.")
+        elif not is_question and intonation['final_slope'] > 10.0:
+            suggestions.append("Statements usually end with a falling voice.")
+    return suggestions
+
+def benchmark(seconds=3.0, sample_rate=16000, repeat=20):
+    """
+    Time extract_prosody on a synthetic utterance
+
+    Returns:
+        dict: Audio seconds, mean processing seconds and the real-time factor
+    """
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pitch = 120 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    signal = (0.3 * np.sin(2 * np.pi * np.cumsum(pitch) / sample_rate)).astype(np.float32)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        extract_prosody(signal, sample_rate)
+    elapsed = (time.perf_counter() - start) / repeat
+    return {'audio_seconds': seconds, 'processing_seconds': elapsed, 'real_time_factor': elapsed / seconds}
+
+if __name__ == '__main__':
+    result = benchmark()
+    print(f"{result['audio_seconds']:.1f}s of audio in {result['processing_seconds'] * 1000:.1f} ms "
+          f"(real-time factor {result['real_time_factor']:.4f})")
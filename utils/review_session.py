@@ -0,0 +1,199 @@
+# Review Session Module
+#
+# Buffers the grades of a Review Deck session and commits them to the SRS store
+# in batches: when the session ends, every FLUSH_EVERY cards, or when a timer
+# fires. Each grade is first appended to a small journal file, so a crash loses
+# nothing: recover_journals() replays leftover journals on the next start.
+
+import json
+import os
+import sys
+import threading
+import uuid
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import srs_engine
+from utils.srs_store import srs_store, DEFAULT_SRS_USER
+from utils.srs_scheduler import DEFAULT_ALGORITHM
+
+REVIEW_JOURNAL_DIR = 'data/review_journal'
+FLUSH_EVERY = 20
+FLUSH_INTERVAL_SECONDS = 60
+
+class ReviewSession:
+    """
+    One user's review session with buffered, journaled commits.
+
+    grade() schedules the card at once (so the learner sees the result) but
+    only appends one line to the session journal; the store is written in one
+    transaction per flush. Cards graded since the last flush are held back
+    from get_words_for_review so they are not served twice.
+    """
+
+    def __init__(self, user_id=DEFAULT_SRS_USER, word_bank_path='data/word_bank.csv', store=None,
+                 algorithm=DEFAULT_ALGORITHM, flush_every=FLUSH_EVERY,
+                 flush_interval=FLUSH_INTERVAL_SECONDS, journal_dir=REVIEW_JOURNAL_DIR):
+        self.user_id = user_id
+        self.word_bank_path = word_bank_path
+        self.store = store or srs_store
+        self.algorithm = algorithm
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.session_id = uuid.uuid4().hex
+        self.journal_path = os.path.join(journal_dir, f"{self.session_id}.jsonl")
+        self.closed = False
+        self.stats = {'graded': 0, 'flushes': 0, 'cards_written': 0}
+        self._pending = {}  # word -> card after its latest grade
+        self._graded = set()  # every word graded in this session
+        self._journal = None
+        self._timer = None
+        self._lock = threading.RLock()
+        os.makedirs(journal_dir, exist_ok=True)
+        # Seeds the user's cards from the word bank if needed
+        srs_engine.get_due_queue(user_id, word_bank_path, self.store)
+
+    def _current_card(self, word):
+        card = self._pending.get(word)
+        if card is None:
+            card = self.store.get_card(self.user_id, word)
+        return card
+
+    def grade(self, word, grade):
+        """
+        Grade a card
+
+        Args:
+            word (str): Word reviewed
+            grade (int): Review grade (srs_scheduler.GRADE_*)
+
+        Returns:
+            dict: The card after the review, or None if the word is unknown
+        """
+        with self._lock:
+            if self.closed:
+                raise RuntimeError("Review session is closed")
+            card = self._current_card(word)
+            if card is None:
+                return None
+            reviewed = srs_engine.review_card(card, grade, self.algorithm)
+            self._append_journal(reviewed)
+            self._pending[word] = reviewed
+            self._graded.add(word)
+            self.stats['graded'] += 1
+            if len(self._pending) >= self.flush_every:
+                self.flush()
+            else:
+                self._arm_timer()
+            return reviewed
+
+    def _append_journal(self, card):
+        if self._journal is None:
+            self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        self._journal.write(json.dumps({'user_id': self.user_id, **card}, ensure_ascii=False) + '\n')
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def _arm_timer(self):
+        if self._timer is None and self.flush_interval:
+            self._timer = threading.Timer(self.flush_interval, self._flush_from_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_from_timer(self):
+        try:
+            with self._lock:
+                self._timer = None
+                if not self.closed:
+                    self.flush()
+        except Exception as e:
+            print(f"Error flushing review session: {e}")
+
+    def flush(self):
+        """
+        Commit every pending grade in one transaction and clear the journal
+
+        Returns:
+            int: Number of cards written
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return 0
+            written = srs_engine.save_reviews(self.user_id, list(self._pending.values()), self.store)
+            self._pending.clear()
+            # Everything journaled so far is committed; start the journal afresh
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            _remove_quietly(self.journal_path)
+            self.stats['flushes'] += 1
+            self.stats['cards_written'] += written
+            return written
+
+    def close(self):
+        """End the session: flush what is pending and stop the timer"""
+        with self._lock:
+            if self.closed:
+                return
+            self.flush()
+            self.closed = True
+
+    def get_words_for_review(self, max_words=10):
+        """
+        Due words for this session, leaving out cards already graded in it
+
+        Returns:
+            DataFrame: See srs_engine.get_words_for_review
+        """
+        with self._lock:
+            graded = set(self._graded)
+        words = srs_engine.get_words_for_review(self.word_bank_path, max_words + len(graded), self.user_id, self.store)
+        if len(words) == 0:
+            return words
+        return words[~words['word'].isin(graded)].head(max_words)
+
+def recover_journals(journal_dir=REVIEW_JOURNAL_DIR, store=None):
+    """
+    Commit the grades left in journals by sessions that did not flush (e.g. after a crash)
+
+    Journal lines hold the card state after each grade, so replaying them is
+    idempotent. A line cut short by the crash is ignored.
+
+    Args:
+        journal_dir (str): Journal directory
+        store (SRSStore): SRS store (default: data/srs.db)
+
+    Returns:
+        int: Number of cards recovered
+    """
+    if not os.path.isdir(journal_dir):
+        return 0
+    recovered = 0
+    for name in sorted(os.listdir(journal_dir)):
+        if not name.endswith('.jsonl'):
+            continue
+        path = os.path.join(journal_dir, name)
+        latest = {}
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                user_id = entry.pop('user_id')
+                latest[(user_id, entry['word'])] = entry
+        by_user = {}
+        for (user_id, _), card in latest.items():
+            by_user.setdefault(user_id, []).append(card)
+        for user_id, cards in by_user.items():
+            recovered += srs_engine.save_reviews(user_id, cards, store)
+        _remove_quietly(path)
+    return recovered
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,258 @@
+# Similarity Module
+#
+# Edit distance with the bit-parallel algorithm of Myers (1999) in the
+# formulation of Hyyrö (2001). Python integers serve as arbitrarily wide bit
+# vectors, so one pass over the text costs a handful of integer operations per
+# symbol regardless of the pattern length. Sequences may be strings
+# (character-level) or lists of tokens (word-level).
+#
+# Run `python -m utils.similarity` for a micro-benchmark against difflib.
+
+import time
+from difflib import SequenceMatcher
+
+def _pattern_masks(pattern):
+    """Bit mask of the positions of every symbol in the pattern"""
+    masks = {}
+    bit = 1
+    for symbol in pattern:
+        masks[symbol] = masks.get(symbol, 0) | bit
+        bit <<= 1
+    return masks
+
+def _distance_with_masks(masks, m, text):
+    """Levenshtein distance between a pattern (given as masks, length m) and a text"""
+    if m == 0:
+        return len(text)
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv = full
+    mv = 0
+    score = m
+    for symbol in text:
+        eq = masks.get(symbol, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = (mv | ~(xh | pv)) & full
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = (mh | ~(xv | ph)) & full
+        mv = ph & xv
+    return score
+
+def levenshtein(a, b):
+    """
+    Levenshtein (edit) distance between two sequences
+
+    Args:
+        a (str or list): First sequence
+        b (str or list): Second sequence
+
+    Returns:
+        int: Minimum number of insertions, deletions and substitutions
+    """
+    # The shorter sequence is the pattern so the bit vectors stay small
+    if len(a) > len(b):
+        a, b = b, a
+    return _distance_with_masks(_pattern_masks(a), len(a), b)
+
+def normalized_similarity(a, b):
+    """
+    Similarity in [0, 1] derived from the edit distance
+
+    Args:
+        a (str or list): First sequence
+        b (str or list): Second sequence
+
+    Returns:
+        float: 1 - distance / length of the longer sequence (1.0 for two empty sequences)
+    """
+    longest = max(len(a), len(b))
+    if longest == 0:
+        return 1.0
+    return 1.0 - levenshtein(a, b) / longest
+
+def token_similarity(a, b):
+    """
+    Word-level similarity in [0, 1] of two whitespace-separated texts
+
+    Args:
+        a (str): First text
+        b (str): Second text
+
+    Returns:
+        float: Normalized similarity of the token sequences
+    """
+    return normalized_similarity(a.split(), b.split())
+
+def batch_similarity(hypothesis, references):
+    """
+    Score one hypothesis against many references in a single call
+
+    The hypothesis bit masks are built once and reused for every reference.
+
+    Args:
+        hypothesis (str or list): Sequence to score (e.g. a transcription)
+        references (iterable): Sequences to compare it with
+
+    Returns:
+        list: Normalized similarity in [0, 1] for each reference, in order
+    """
+    masks = _pattern_masks(hypothesis)
+    m = len(hypothesis)
+    scores = []
+    for reference in references:
+        longest = max(m, len(reference))
+        if longest == 0:
+            scores.append(1.0)
+        else:
+            scores.append(1.0 - _distance_with_masks(masks, m, reference) / longest)
+    return scores
+
+FULL_ALIGNMENT_CELLS = 4096
+DEFAULT_ALIGNMENT_BAND = 16
+
+def align_words(expected_words, transcribed_words, band=None, expected_keys=None, transcribed_keys=None):
+    """
+    Optimal word alignment with substitution, insertion and deletion
+
+    Substituting one word for another costs 1 - their character similarity
+    (0 for an exact match); a missing or extra word costs 1. Long passages are
+    aligned inside a band around the (length-scaled) diagonal, so the cost stays
+    near-linear in the number of words.
+
+    Args:
+        expected_words (list): Reference words
+        transcribed_words (list): Recognized words
+        band (int): Band half-width in words; None aligns short inputs exactly
+            and long ones with DEFAULT_ALIGNMENT_BAND
+        expected_keys (list): Optional per-word sequences compared instead of the
+            words themselves (e.g. phonemes); same length as expected_words
+        transcribed_keys (list): Same for transcribed_words
+
+    Returns:
+        list: Ops in order, each {'op': 'match' | 'substitute' | 'delete' | 'insert',
+              'expected': str or None, 'transcribed': str or None, 'score': 0-100,
+              'expected_index': int or None, 'transcribed_index': int or None}.
+              'delete' is an expected word that was not said, 'insert' an extra word.
+    """
+    n = len(expected_words)
+    m = len(transcribed_words)
+    expected_keys = expected_words if expected_keys is None else expected_keys
+    transcribed_keys = transcribed_words if transcribed_keys is None else transcribed_keys
+    if n == 0 or m == 0:
+        band = None
+    elif band is None and (n + 1) * (m + 1) > FULL_ALIGNMENT_CELLS:
+        band = DEFAULT_ALIGNMENT_BAND
+    if band is not None:
+        # Widen by the diagonal's slope so consecutive rows' windows always overlap
+        band += -(-m // n)
+
+    def window(i):
+        if band is None:
+            return 0, m
+        center = round(i * m / n)
+        return max(0, center - band), min(m, center + band)
+
+    inf = float('inf')
+    cost = {(0, 0): 0.0}
+    back = {}
+    similarity = {}
+    for i in range(n + 1):
+        lo, hi = window(i)
+        if i > 0:
+            scores = batch_similarity(expected_keys[i - 1], transcribed_keys[max(lo - 1, 0):hi])
+            for offset, score in enumerate(scores):
+                similarity[(i, max(lo - 1, 0) + offset + 1)] = score
+        for j in range(lo, hi + 1):
+            if i == 0 and j == 0:
+                continue
+            best, move = inf, None
+            if i > 0 and j > 0 and (i - 1, j - 1) in cost:
+                best, move = cost[(i - 1, j - 1)] + 1.0 - similarity[(i, j)], 'diag'
+            if i > 0 and (i - 1, j) in cost and cost[(i - 1, j)] + 1.0 < best:
+                best, move = cost[(i - 1, j)] + 1.0, 'delete'
+            if j > 0 and (i, j - 1) in cost and cost[(i, j - 1)] + 1.0 < best:
+                best, move = cost[(i, j - 1)] + 1.0, 'insert'
+            if move is not None:
+                cost[(i, j)] = best
+                back[(i, j)] = move
+
+    ops = []
+    i, j = n, m
+    while i > 0 or j > 0:
+        move = back[(i, j)]
+        if move == 'diag':
+            score = similarity[(i, j)]
+            ops.append({
+                'op': 'match' if score == 1.0 else 'substitute',
+                'expected': expected_words[i - 1],
+                'transcribed': transcribed_words[j - 1],
+                'score': score * 100,
+                'expected_index': i - 1,
+                'transcribed_index': j - 1
+            })
+            i, j = i - 1, j - 1
+        elif move == 'delete':
+            ops.append({'op': 'delete', 'expected': expected_words[i - 1], 'transcribed': None, 'score': 0.0,
+                        'expected_index': i - 1, 'transcribed_index': None})
+            i -= 1
+        else:
+            ops.append({'op': 'insert', 'expected': None, 'transcribed': transcribed_words[j - 1], 'score': 0.0,
+                        'expected_index': None, 'transcribed_index': j - 1})
+            j -= 1
+    ops.reverse()
+    return ops
+
+def alignment_score(ops):
+    """
+    Aggregate score (0-100) of a word alignment: the mean of its op scores
+
+    Args:
+        ops (list): Output of align_words
+
+    Returns:
+        float: 100 for a perfect alignment, 0 when nothing lines up
+    """
+    if not ops:
+        return 100.0
+    return sum(op['score'] for op in ops) / len(ops)
+
+def benchmark(repeat=2000):
+    """
+    Compare this module with the SequenceMatcher ratio previously used for scoring
+
+    Args:
+        repeat (int): Iterations per case
+
+    Returns:
+        dict: case -> {'levenshtein_us': float, 'sequence_matcher_us': float}
+    """
+    cases = {
+        'word': ('dziękuję', 'dzienkuje'),
+        'sentence': ('dzień dobry nazywam się anna', 'dzien dobry nazywa sie ana'),
+        'story': ('dzień dobry nazywam się anna jestem z polski dziś jest mój pierwszy dzień w nowej szkole ' * 3,
+                  'dzien dobry nazywam sie ana jestem polski dzis jest moj pierwszy dzien w nowej szkole ' * 3)
+    }
+    results = {}
+    for name, (expected, actual) in cases.items():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            normalized_similarity(expected, actual)
+        levenshtein_us = (time.perf_counter() - start) / repeat * 1e6
+        start = time.perf_counter()
+        for _ in range(repeat):
+            SequenceMatcher(None, expected, actual).ratio()
+        matcher_us = (time.perf_counter() - start) / repeat * 1e6
+        results[name] = {'levenshtein_us': levenshtein_us, 'sequence_matcher_us': matcher_us}
+    return results
+
+if __name__ == '__main__':
+    for case, timings in benchmark().items():
+        print(f"{case:>8}: bit-parallel {timings['levenshtein_us']:8.1f} us   "
+              f"SequenceMatcher {timings['sequence_matcher_us']:8.1f} us")
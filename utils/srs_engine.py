@@ -3,44 +3,170 @@
 import pandas as pd
 from datetime import datetime, timedelta
 import math
+import os
+import sys
+import threading
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.srs_store import srs_store, DEFAULT_SRS_USER, CARD_FIELDS
+from utils.due_queue import DueQueue
+from utils.learning_stats import LearningStats, parse_tags, compare_stats
+from utils.srs_scheduler import (
+    DEFAULT_ALGORITHM, grade_from_answer, cards_to_arrays, arrays_to_cards,
+    schedule_reviews, migrate_schedule, rebalance_overdue
+)
+
+# Clock used for all scheduling; simulations replace it with set_clock
+_clock = datetime.now
+
+def now():
+    """Current time according to the SRS clock"""
+    return _clock()
+
+def set_clock(clock=None):
+    """
+    Replace the SRS clock (e.g. with a simulated one)
+    
+    Args:
+        clock (callable): Function returning a datetime; None restores datetime.now
+    """
+    global _clock
+    _clock = clock or datetime.now
 
 def calculate_next_review(familiarity_score, last_review_date=None, correct_answer=True):
     """
     Calculate when a word should be reviewed next based on SRS algorithm
     
+    A one-card wrapper around the bucket scheduler (srs_scheduler.BucketScheduler).
+    
     Args:
         familiarity_score (int): Current familiarity score (1-10)
         last_review_date (datetime): When the word was last reviewed
         correct_answer (bool): Whether the user answered correctly
     
     Returns:
-        datetime: Next review date
+        tuple: (next review datetime, new familiarity)
     """
     if last_review_date is None:
-        last_review_date = datetime.now()
-    
-    # Adjust familiarity based on performance
-    if correct_answer:
-        new_familiarity = min(10, familiarity_score + 1)
-    else:
-        new_familiarity = max(1, familiarity_score - 2)
-    
-    # Calculate interval based on familiarity (exponential growth)
-    if new_familiarity <= 2:
-        interval_days = 1  # Review tomorrow
-    elif new_familiarity <= 4:
-        interval_days = 3  # Review in 3 days
-    elif new_familiarity <= 6:
-        interval_days = 7  # Review in a week
-    elif new_familiarity <= 8:
-        interval_days = 14  # Review in 2 weeks
-    else:
-        interval_days = 30  # Review in a month
-    
-    next_review = last_review_date + timedelta(days=interval_days)
-    return next_review, new_familiarity
-
-def update_familiarity(word_id, correct_answer, word_bank_path='data/word_bank.csv'):
+        last_review_date = now()
+    
+    day = last_review_date.toordinal()
+    arrays = {
+        'familiarity': np.array([familiarity_score], dtype=np.int64),
+        'last_review': np.array([day], dtype=np.int64),
+        'next_review': np.array([day], dtype=np.int64)
+    }
+    result = schedule_reviews(arrays, [grade_from_answer(correct_answer)], day, 'buckets')
+    
+    next_review = last_review_date + timedelta(days=int(result['interval'][0]))
+    return next_review, int(result['familiarity'][0])
+
+# Word bank rows by word, re-read only when the CSV changes
+_word_bank_cache = {}
+
+def _load_word_bank(word_bank_path):
+    """Word bank rows keyed by word (cached by file modification time)"""
+    mtime = os.path.getmtime(word_bank_path)
+    cached = _word_bank_cache.get(word_bank_path)
+    if cached is None or cached[0] != mtime:
+        word_bank = pd.read_csv(word_bank_path)
+        cached = (mtime, {row['word']: row for row in word_bank.to_dict('records')}, list(word_bank.columns))
+        _word_bank_cache[word_bank_path] = cached
+    return cached[1], cached[2]
+
+# Per-user due queues, built from the store on first use and then kept current
+# by every review written through this module
+_due_queues = {}
+# Per-user review forecasts, dropped whenever that user's cards change
+_forecast_cache = {}
+# Per-user learning statistics (with the word bank mtime their tags came from),
+# updated by every review written through this module
+_learning_stats = {}
+_due_queues_lock = threading.Lock()
+
+def _prepare_user(store, user_id, word_bank_path):
+    """Seed a user's cards; newly added words invalidate the user's indexes"""
+    if store.ensure_user(user_id, word_bank_path):
+        _invalidate_user(store, user_id)
+
+def _invalidate_user(store, user_id):
+    with _due_queues_lock:
+        _due_queues.pop((store.db_path, user_id), None)
+        _forecast_cache.pop((store.db_path, user_id), None)
+        _learning_stats.pop((store.db_path, user_id), None)
+
+def get_due_queue(user_id=DEFAULT_SRS_USER, word_bank_path='data/word_bank.csv', store=None):
+    """
+    Get a user's due-queue index (see due_queue.DueQueue)
+    
+    Args:
+        user_id (str): User's ID or username
+        word_bank_path (str): Path to word bank CSV
+        store (SRSStore): SRS store (default: data/srs.db)
+    
+    Returns:
+        DueQueue: The user's cards ordered by (due date, familiarity)
+    """
+    store = store or srs_store
+    _prepare_user(store, user_id, word_bank_path)
+    key = (store.db_path, user_id)
+    with _due_queues_lock:
+        queue = _due_queues.get(key)
+    if queue is None:
+        queue = DueQueue(store.get_cards(user_id))
+        with _due_queues_lock:
+            queue = _due_queues.setdefault(key, queue)
+    return queue
+
+def _on_reviews_applied(store, user_id, cards):
+    """Bring the in-memory indexes in step with cards just written to the store"""
+    with _due_queues_lock:
+        queue = _due_queues.get((store.db_path, user_id))
+        _forecast_cache.pop((store.db_path, user_id), None)
+        stats = _learning_stats.get((store.db_path, user_id))
+    if queue is not None:
+        queue.update(cards)
+    if stats is not None:
+        stats[1].apply(cards)
+
+def save_reviews(user_id, cards, store=None):
+    """
+    Write reviewed cards in one transaction and update the user's indexes
+    
+    Args:
+        user_id (str): User's ID or username
+        cards (list): Card dicts with 'word', 'familiarity', 'last_review' and 'next_review'
+        store (SRSStore): SRS store (default: data/srs.db)
+    
+    Returns:
+        int: Number of cards written
+    """
+    store = store or srs_store
+    written = store.apply_reviews(
+        (user_id, card['word'], card['familiarity'], card['last_review'], card['next_review'])
+        for card in cards
+    )
+    _on_reviews_applied(store, user_id, cards)
+    return written
+
+def review_card(card, grade, algorithm=DEFAULT_ALGORITHM):
+    """
+    Apply one review to a card (nothing is written)
+    
+    Args:
+        card (dict): Card with 'word', 'familiarity', 'last_review' and 'next_review'
+        grade (int): Review grade (srs_scheduler.GRADE_*)
+        algorithm (str): Scheduling algorithm
+    
+    Returns:
+        dict: The card after the review
+    """
+    today = now().date().toordinal()
+    result = schedule_reviews(cards_to_arrays([card], today), [grade], today, algorithm)
+    return arrays_to_cards([card['word']], result)[0]
+
+def update_familiarity(word_id, correct_answer, word_bank_path='data/word_bank.csv', user_id=DEFAULT_SRS_USER,
+                       store=None, grade=None, algorithm=DEFAULT_ALGORITHM):
     """
     Update familiarity score for a word based on user performance
     
@@ -48,112 +174,302 @@ def update_familiarity(word_id, correct_answer, word_bank_path='data/word_bank.c
         word_id (str): The word to update
         correct_answer (bool): Whether the user answered correctly
         word_bank_path (str): Path to word bank CSV
+        user_id (str): User's ID or username
+        store (SRSStore): SRS store (default: data/srs.db)
+        grade (int): Optional finer grade (srs_scheduler.GRADE_*) instead of correct_answer
+        algorithm (str): Scheduling algorithm ('buckets', 'sm2' or 'fsrs')
+    
+    Returns:
+        int: New familiarity score, or None if the word is unknown or on error
     """
+    store = store or srs_store
     try:
-        # Load word bank
-        word_bank = pd.read_csv(word_bank_path)
+        _prepare_user(store, user_id, word_bank_path)
+        card = store.get_card(user_id, word_id)
         
-        # Find the word
-        word_index = word_bank[word_bank['word'] == word_id].index
-        
-        if len(word_index) > 0:
-            current_familiarity = word_bank.loc[word_index[0], 'familiarity']
-            
-            # Calculate new familiarity and next review
-            next_review, new_familiarity = calculate_next_review(
-                current_familiarity, 
-                datetime.now(), 
-                correct_answer
-            )
-            
-            # Update the word bank
-            word_bank.loc[word_index[0], 'familiarity'] = new_familiarity
-            word_bank.loc[word_index[0], 'last_review'] = datetime.now().strftime('%Y-%m-%d')
-            word_bank.loc[word_index[0], 'next_review'] = next_review.strftime('%Y-%m-%d')
-            
-            # Save back to CSV
-            word_bank.to_csv(word_bank_path, index=False)
-            
-            return new_familiarity
-        else:
+        if card is None:
             return None
+        
+        # Calculate new familiarity and next review
+        grade = grade_from_answer(correct_answer) if grade is None else grade
+        reviewed = review_card(card, grade, algorithm)
+        
+        # Only this card's row is written
+        save_reviews(user_id, [reviewed], store)
+        
+        return reviewed['familiarity']
             
     except Exception as e:
         print(f"Error updating familiarity: {e}")
         return None
 
-def get_words_for_review(word_bank_path='data/word_bank.csv', max_words=10):
+def _reschedule_user(user_id, job, word_bank_path, store):
+    """Run a vectorized job over a user's whole deck and write only the cards it moved"""
+    store = store or srs_store
+    cards = get_due_queue(user_id, word_bank_path, store).cards()
+    if not cards:
+        return 0
+    today = now().date().toordinal()
+    arrays = cards_to_arrays(cards, today)
+    result = job(arrays, today)
+    # Cards never reviewed are left alone, so no review date is made up for them
+    changed = ((result['next_review'] != arrays['next_review']) & ~arrays['is_new']).nonzero()[0]
+    words = [cards[i]['word'] for i in changed]
+    subset = {name: result[name][changed] for name in ('familiarity', 'last_review', 'next_review')}
+    return save_reviews(user_id, arrays_to_cards(words, subset), store)
+
+def rebalance_reviews(user_id=DEFAULT_SRS_USER, spread_days=7, word_bank_path='data/word_bank.csv', store=None):
+    """
+    Spread a user's overdue backlog over the next days (e.g. after an absence)
+    
+    Args:
+        user_id (str): User's ID or username
+        spread_days (int): Days to spread the backlog over
+        word_bank_path (str): Path to word bank CSV
+        store (SRSStore): SRS store (default: data/srs.db)
+    
+    Returns:
+        int: Number of cards rescheduled
+    """
+    try:
+        return _reschedule_user(user_id, lambda arrays, today: rebalance_overdue(arrays, today, spread_days),
+                                word_bank_path, store)
+    except Exception as e:
+        print(f"Error rebalancing reviews: {e}")
+        return 0
+
+def migrate_algorithm(algorithm, user_ids=None, word_bank_path='data/word_bank.csv', store=None):
+    """
+    Move users to another scheduling algorithm by recomputing every due date
+    
+    Args:
+        algorithm (str): 'buckets', 'sm2' or 'fsrs'
+        user_ids (list): Users to migrate (default: every user in the store)
+        word_bank_path (str): Path to word bank CSV
+        store (SRSStore): SRS store (default: data/srs.db)
+    
+    Returns:
+        dict: user_id -> number of cards rescheduled
+    """
+    store = store or srs_store
+    results = {}
+    for user_id in (store.users() if user_ids is None else user_ids):
+        try:
+            results[user_id] = _reschedule_user(user_id, lambda arrays, today: migrate_schedule(arrays, algorithm),
+                                                word_bank_path, store)
+        except Exception as e:
+            print(f"Error migrating {user_id} to {algorithm}: {e}")
+            results[user_id] = 0
+    return results
+
+def get_words_for_review(word_bank_path='data/word_bank.csv', max_words=10, user_id=DEFAULT_SRS_USER, store=None):
     """
     Get words that need to be reviewed today
     
     Args:
         word_bank_path (str): Path to word bank CSV
         max_words (int): Maximum number of words to return
+        user_id (str): User's ID or username
+        store (SRSStore): SRS store (default: data/srs.db)
     
     Returns:
-        DataFrame: Words that need review
+        DataFrame: Word bank rows of the most overdue words (lowest familiarity
+                   first within a day), then new words, with the user's
+                   familiarity, last_review and next_review
     """
     try:
-        word_bank = pd.read_csv(word_bank_path)
-        today = datetime.now().date()
-        
-        # Add next_review column if it doesn't exist
-        if 'next_review' not in word_bank.columns:
-            word_bank['next_review'] = today.strftime('%Y-%m-%d')
-        
-        # Convert next_review to datetime
-        word_bank['next_review'] = pd.to_datetime(word_bank['next_review'], errors='coerce')
+        queue = get_due_queue(user_id, word_bank_path, store)
+        words, columns = _load_word_bank(word_bank_path)
         
-        # Fill NaN values with today's date
-        word_bank['next_review'] = word_bank['next_review'].fillna(pd.Timestamp(today))
+        # Only the top entries of the due queue are visited
+        rows = []
+        for card in queue.top(now().date(), max_words):
+            if card['word'] in words:
+                rows.append({**words[card['word']], **card})
         
-        # Filter words that need review (next_review <= today)
-        words_for_review = word_bank[word_bank['next_review'].dt.date <= today]
-        
-        # Sort by familiarity (lowest first) and limit
-        words_for_review = words_for_review.sort_values('familiarity').head(max_words)
-        
-        return words_for_review
+        return pd.DataFrame(rows, columns=list(dict.fromkeys(columns + list(CARD_FIELDS))))
         
     except Exception as e:
         print(f"Error getting words for review: {e}")
         return pd.DataFrame()
 
-def get_learning_stats(word_bank_path='data/word_bank.csv'):
+def get_word_familiarity(word_bank_path='data/word_bank.csv', user_id=DEFAULT_SRS_USER, store=None):
     """
-    Get learning statistics from the word bank
+    Get a user's familiarity with every word
     
     Args:
         word_bank_path (str): Path to word bank CSV
+        user_id (str): User's ID or username
+        store (SRSStore): SRS store (default: data/srs.db)
     
     Returns:
-        dict: Learning statistics
+        dict: word -> familiarity (1-10)
     """
     try:
-        word_bank = pd.read_csv(word_bank_path)
+        return {card['word']: card['familiarity'] for card in get_due_queue(user_id, word_bank_path, store).cards()}
+    except Exception as e:
+        print(f"Error getting word familiarity: {e}")
+        return {}
+
+def count_words_due(word_bank_path='data/word_bank.csv', user_id=DEFAULT_SRS_USER, store=None, on_date=None):
+    """
+    Count the words due for review without loading them
+    
+    Args:
+        word_bank_path (str): Path to word bank CSV
+        user_id (str): User's ID or username
+        store (SRSStore): SRS store (default: data/srs.db)
+        on_date (date): Day to count for (default: today)
+    
+    Returns:
+        int: Number of words due on or before that day
+    """
+    try:
+        queue = get_due_queue(user_id, word_bank_path, store)
+        return queue.count_due(on_date or now().date())
+    except Exception as e:
+        print(f"Error counting words due: {e}")
+        return 0
+
+def forecast_reviews(days=14, word_bank_path='data/word_bank.csv', user_id=DEFAULT_SRS_USER, store=None,
+                     max_new_per_day=None):
+    """
+    Project the number of reviews due on each of the next days
+    
+    Overdue cards count toward today. With max_new_per_day, cards that were
+    never reviewed are spread forward so at most that many new cards land on
+    any day (the order of new cards is kept).
+    
+    Args:
+        days (int): Number of days to forecast, starting today
+        word_bank_path (str): Path to word bank CSV
+        user_id (str): User's ID or username
+        store (SRSStore): SRS store (default: data/srs.db)
+        max_new_per_day (int): Optional cap on new cards per day
+    
+    Returns:
+        DataFrame: One row per day with 'date', 'reviews' (total due) and 'new'
+    """
+    store = store or srs_store
+    try:
+        queue = get_due_queue(user_id, word_bank_path, store)
+        today = now().date().toordinal()
+        key = (store.db_path, user_id)
+        params = (today, days, max_new_per_day)
+        with _due_queues_lock:
+            cached = _forecast_cache.get(key, {}).get(params)
+        if cached is not None:
+            return cached.copy()
         
-        total_words = len(word_bank)
-        needs_review = len(word_bank[word_bank['familiarity'] <= 3])
-        learning = len(word_bank[(word_bank['familiarity'] >= 4) & (word_bank['familiarity'] <= 6)])
-        known = len(word_bank[word_bank['familiarity'] >= 7])
+        cards = queue.cards()
+        arrays = cards_to_arrays(cards, today)
+        is_new = arrays['is_new']
+        offsets = np.maximum(arrays['next_review'] - today, 0)
+        if max_new_per_day and is_new.any():
+            # The k-th new card cannot land before day k // cap
+            new_offsets = offsets[is_new]
+            order = np.argsort(new_offsets, kind='stable')
+            new_offsets[order] = np.maximum(new_offsets[order], np.arange(len(order)) // max_new_per_day)
+            offsets[is_new] = new_offsets
+        in_range = offsets < days
+        reviews = np.bincount(offsets[in_range], minlength=days)
+        new = np.bincount(offsets[in_range & is_new], minlength=days)
+        forecast = pd.DataFrame({
+            'date': [datetime.fromordinal(today + day).date() for day in range(days)],
+            'reviews': reviews,
+            'new': new
+        })
         
-        stats = {
-            'total_words': total_words,
-            'needs_review': needs_review,
-            'learning': learning,
-            'known': known,
-            'completion_percentage': (known / total_words * 100) if total_words > 0 else 0
-        }
+        with _due_queues_lock:
+            _forecast_cache.setdefault(key, {})[params] = forecast
+        return forecast.copy()
         
-        return stats
+    except Exception as e:
+        print(f"Error forecasting reviews: {e}")
+        return pd.DataFrame(columns=['date', 'reviews', 'new'])
+
+def _word_tags(words):
+    """Tags of every word bank row"""
+    return {word: parse_tags(row.get('tags')) for word, row in words.items()}
+
+def _get_learning_stats_index(user_id, word_bank_path, store):
+    """A user's maintained learning statistics, built from the due queue on first use"""
+    store = store or srs_store
+    queue = get_due_queue(user_id, word_bank_path, store)
+    key = (store.db_path, user_id)
+    mtime = os.path.getmtime(word_bank_path)
+    with _due_queues_lock:
+        cached = _learning_stats.get(key)
+    # Rebuilt when the word bank changes, since its tags may have changed
+    if cached is None or cached[0] != mtime:
+        words, _ = _load_word_bank(word_bank_path)
+        cached = (mtime, LearningStats(queue.cards(), _word_tags(words)))
+        with _due_queues_lock:
+            _learning_stats[key] = cached
+    return cached[1]
+
+def get_learning_stats(word_bank_path='data/word_bank.csv', user_id=DEFAULT_SRS_USER, store=None,
+                       by_tag=False, verify=False):
+    """
+    Get learning statistics for a user's cards
+    
+    The counters are maintained as reviews are applied, so a call does not
+    scan the deck. With verify=True they are recomputed from scratch first
+    and any drift is reported (see verify_learning_stats).
+    
+    Args:
+        word_bank_path (str): Path to word bank CSV
+        user_id (str): User's ID or username
+        store (SRSStore): SRS store (default: data/srs.db)
+        by_tag (bool): Also return a breakdown per word bank tag
+        verify (bool): Recompute from scratch and report drift
+    
+    Returns:
+        dict: Learning statistics ('by_tag' maps each tag to the same keys)
+    """
+    try:
+        if verify:
+            verify_learning_stats(word_bank_path, user_id, store)
+        return _get_learning_stats_index(user_id, word_bank_path, store).summary(by_tag)
         
     except Exception as e:
         print(f"Error getting learning stats: {e}")
-        return {
+        stats = {
             'total_words': 0,
             'needs_review': 0,
             'learning': 0,
             'known': 0,
             'completion_percentage': 0
         }
+        if by_tag:
+            stats['by_tag'] = {}
+        return stats
 
+def verify_learning_stats(word_bank_path='data/word_bank.csv', user_id=DEFAULT_SRS_USER, store=None, repair=True):
+    """
+    Recompute a user's learning statistics from the store and word bank and
+    compare them with the maintained counters
+    
+    Args:
+        word_bank_path (str): Path to word bank CSV
+        user_id (str): User's ID or username
+        store (SRSStore): SRS store (default: data/srs.db)
+        repair (bool): Replace the maintained counters with the recomputed ones on drift
+    
+    Returns:
+        dict: {'stats' (recomputed, with 'by_tag'),
+               'drift' ({'total' or tag: {key: (maintained, recomputed)}}, empty when in step)}
+    """
+    store = store or srs_store
+    maintained = _get_learning_stats_index(user_id, word_bank_path, store).summary(by_tag=True)
+    word_bank = pd.read_csv(word_bank_path)
+    tags = _word_tags({row['word']: row for row in word_bank.to_dict('records')})
+    fresh = LearningStats(store.get_cards(user_id), tags)
+    recomputed = fresh.summary(by_tag=True)
+    drift = compare_stats(maintained, recomputed)
+    if drift:
+        print(f"Learning stats drift for {user_id}: {drift}")
+        if repair:
+            with _due_queues_lock:
+                _learning_stats[(store.db_path, user_id)] = (os.path.getmtime(word_bank_path), fresh)
+    return {'stats': recomputed, 'drift': drift}
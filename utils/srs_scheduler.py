@@ -0,0 +1,277 @@
+# SRS Scheduler Module
+#
+# Vectorized spaced repetition scheduling: every function takes whole NumPy
+# arrays (one element per card), so a full deck is rescheduled in one call.
+# Dates are day numbers (date.toordinal()). Three algorithms are available:
+#
+#   buckets - the original familiarity buckets (1/3/7/14/30 days)
+#   sm2     - SuperMemo-2 style: intervals grow by an ease factor
+#   fsrs    - FSRS style: a memory-stability model with a target retention
+#
+# The store only keeps familiarity and the last/next review dates, so the
+# per-card state the algorithms need (current interval, ease, stability) is
+# derived from those.
+
+import os
+import sys
+from datetime import date
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.due_queue import day_number
+
+# Review grades, as on the Review Deck buttons
+GRADE_AGAIN = 0    # Hard: not recalled
+GRADE_GOOD = 1
+GRADE_EASY = 2
+GRADE_PERFECT = 3
+
+MIN_FAMILIARITY = 1
+MAX_FAMILIARITY = 10
+
+def grade_from_answer(correct_answer):
+    """Grade for a plain right/wrong answer"""
+    return GRADE_GOOD if correct_answer else GRADE_AGAIN
+
+def _new_familiarity(familiarity, grades, bonus_for_perfect=True):
+    """Familiarity after a review: -2 when forgotten, +1 when recalled (+2 for perfect)"""
+    step = np.where(grades == GRADE_AGAIN, -2, 1)
+    if bonus_for_perfect:
+        step = step + (grades == GRADE_PERFECT)
+    return np.clip(familiarity + step, MIN_FAMILIARITY, MAX_FAMILIARITY)
+
+class BucketScheduler:
+    """The original scheme: the interval depends only on the new familiarity"""
+
+    name = 'buckets'
+    BUCKET_LIMITS = np.array([2, 4, 6, 8])
+    BUCKET_DAYS = np.array([1, 3, 7, 14, 30])
+
+    def intervals(self, familiarity, interval):
+        """Steady-state interval in days for cards with this familiarity"""
+        return self.BUCKET_DAYS[np.searchsorted(self.BUCKET_LIMITS, familiarity, side='left')]
+
+    def schedule(self, familiarity, interval, elapsed, grades):
+        """
+        Schedule a batch of reviews
+
+        Args:
+            familiarity (np.ndarray): Familiarity before the review (1-10)
+            interval (np.ndarray): Current interval in days (0 for new cards)
+            elapsed (np.ndarray): Days since the previous review
+            grades (np.ndarray): Review grades (GRADE_*)
+
+        Returns:
+            tuple: (new familiarity, next interval in days)
+        """
+        new_familiarity = _new_familiarity(familiarity, grades, bonus_for_perfect=False)
+        return new_familiarity, self.intervals(new_familiarity, interval)
+
+class SM2Scheduler:
+    """
+    SuperMemo-2 style scheduling
+
+    The ease factor is derived from familiarity (1.3 at 1 up to 2.65 at 10) and
+    the SM-2 grade adjustment is applied through the familiarity change. A
+    forgotten card restarts at one day; the first recalls go 1 -> 6 days, then
+    the interval is multiplied by the ease factor.
+    """
+
+    name = 'sm2'
+    MIN_EASE = 1.3
+    EASE_PER_FAMILIARITY = 0.15
+    EASY_BONUS = 1.3
+
+    def _ease(self, familiarity):
+        return self.MIN_EASE + (familiarity - MIN_FAMILIARITY) * self.EASE_PER_FAMILIARITY
+
+    def intervals(self, familiarity, interval):
+        """Interval a card would get for its next successful review"""
+        grown = np.rint(interval * self._ease(familiarity))
+        return np.where(interval < 1, 1, np.where(interval < 6, 6, grown)).astype(np.int64)
+
+    def schedule(self, familiarity, interval, elapsed, grades):
+        """Schedule a batch of reviews (see BucketScheduler.schedule)"""
+        new_familiarity = _new_familiarity(familiarity, grades)
+        # Credit the time actually waited when a late card is still recalled
+        effective = np.maximum(interval, np.where(grades > GRADE_AGAIN, elapsed, 0))
+        next_interval = self.intervals(new_familiarity, effective)
+        next_interval = np.where(grades >= GRADE_EASY, np.rint(next_interval * self.EASY_BONUS), next_interval)
+        next_interval = np.where(grades == GRADE_AGAIN, 1, next_interval)
+        return new_familiarity, next_interval.astype(np.int64)
+
+class FSRSScheduler:
+    """
+    FSRS-style scheduling on a memory-stability model
+
+    Stability S is the interval at which recall probability falls to 90%;
+    recall after t days is R = (1 + t / (9 S))^-1. A successful review raises S
+    by more when the card was harder to recall (low R) and the card is easier
+    (high familiarity); a lapse shrinks it. The next interval is chosen so that
+    R at the due date equals the target retention.
+    """
+
+    name = 'fsrs'
+    GROWTH = np.exp(1.5)
+    STABILITY_DECAY = 0.15
+    LAPSE_FACTOR = 0.25
+    GRADE_BONUS = np.array([1.0, 1.0, 1.3, 1.6])
+
+    def __init__(self, target_retention=0.9):
+        self.target_retention = target_retention
+
+    def _interval_for(self, stability):
+        # Solve (1 + t / (9 S))^-1 = target for t
+        return np.maximum(1, np.rint(9 * stability * (1 / self.target_retention - 1))).astype(np.int64)
+
+    def intervals(self, familiarity, interval):
+        """Interval that keeps the target retention, treating the current interval as stability"""
+        return self._interval_for(np.maximum(interval, 1))
+
+    def schedule(self, familiarity, interval, elapsed, grades):
+        """Schedule a batch of reviews (see BucketScheduler.schedule)"""
+        stability = np.maximum(interval, 1).astype(np.float64)
+        difficulty = (MAX_FAMILIARITY + 1) - familiarity  # 10 = hardest
+        retrievability = 1.0 / (1.0 + np.maximum(elapsed, 0) / (9.0 * stability))
+        growth = 1.0 + self.GROWTH * (11 - difficulty) * stability ** -self.STABILITY_DECAY \
+            * (np.exp(1.0 - retrievability) - 1.0)
+        recalled = stability * np.maximum(growth, 1.05) * self.GRADE_BONUS[grades]
+        lapsed = np.maximum(1.0, stability * self.LAPSE_FACTOR)
+        new_stability = np.where(grades == GRADE_AGAIN, lapsed, recalled)
+        return _new_familiarity(familiarity, grades), self._interval_for(new_stability)
+
+SCHEDULERS = {
+    'buckets': BucketScheduler,
+    'sm2': SM2Scheduler,
+    'fsrs': FSRSScheduler
+}
+DEFAULT_ALGORITHM = 'buckets'
+
+def get_scheduler(algorithm=DEFAULT_ALGORITHM):
+    """
+    Get a scheduler by name
+
+    Args:
+        algorithm (str): 'buckets', 'sm2' or 'fsrs'
+
+    Returns:
+        Scheduler instance
+    """
+    if algorithm not in SCHEDULERS:
+        raise ValueError(f"Unknown SRS algorithm: {algorithm}")
+    return SCHEDULERS[algorithm]()
+
+def cards_to_arrays(cards, today):
+    """
+    Convert card dicts to scheduler arrays
+
+    Args:
+        cards (list): Card dicts with 'familiarity', 'last_review' and 'next_review'
+        today (int): Today's day number (used for cards never reviewed)
+
+    Returns:
+        dict: {'familiarity', 'last_review', 'next_review'} int64 arrays (day numbers)
+              and 'is_new', True for cards never reviewed
+    """
+    return {
+        'familiarity': np.array([card['familiarity'] for card in cards], dtype=np.int64),
+        'last_review': np.array([day_number(card.get('last_review')) or today for card in cards], dtype=np.int64),
+        'next_review': np.array([day_number(card.get('next_review')) or today for card in cards], dtype=np.int64),
+        'is_new': np.array([not card.get('last_review') for card in cards], dtype=bool)
+    }
+
+def arrays_to_cards(words, arrays):
+    """
+    Convert scheduler arrays back to card dicts
+
+    Args:
+        words (list): Word of each card
+        arrays (dict): Arrays as returned by cards_to_arrays or schedule_reviews
+
+    Returns:
+        list: Card dicts with ISO dates (None for the dates of cards marked 'is_new')
+    """
+    familiarity = arrays['familiarity'].tolist()
+    last_review = arrays['last_review'].tolist()
+    next_review = arrays['next_review'].tolist()
+    is_new = arrays['is_new'].tolist() if 'is_new' in arrays else [False] * len(words)
+    return [
+        {
+            'word': word,
+            'familiarity': familiarity[i],
+            'last_review': None if is_new[i] else date.fromordinal(last_review[i]).isoformat(),
+            'next_review': None if is_new[i] else date.fromordinal(next_review[i]).isoformat()
+        }
+        for i, word in enumerate(words)
+    ]
+
+def schedule_reviews(arrays, grades, today, algorithm=DEFAULT_ALGORITHM):
+    """
+    Apply one review to every card in a batch
+
+    Args:
+        arrays (dict): Card arrays (see cards_to_arrays)
+        grades (array-like): Grade of each card's review (GRADE_*)
+        today (int): Review day number
+        algorithm (str): Scheduling algorithm
+
+    Returns:
+        dict: New 'familiarity', 'last_review', 'next_review' and 'interval' arrays
+    """
+    grades = np.asarray(grades, dtype=np.int64)
+    interval = np.maximum(arrays['next_review'] - arrays['last_review'], 0)
+    elapsed = today - arrays['last_review']
+    familiarity, next_interval = get_scheduler(algorithm).schedule(arrays['familiarity'], interval, elapsed, grades)
+    return {
+        'familiarity': familiarity.astype(np.int64),
+        'last_review': np.full(len(grades), today, dtype=np.int64),
+        'next_review': today + next_interval,
+        'interval': next_interval
+    }
+
+def migrate_schedule(arrays, algorithm):
+    """
+    Recompute due dates under another algorithm without a review
+
+    Each card keeps its last review and familiarity; its due date becomes
+    last review + the new algorithm's interval for that state. Cards never
+    reviewed stay new (due now).
+
+    Args:
+        arrays (dict): Card arrays (see cards_to_arrays)
+        algorithm (str): Algorithm to move to
+
+    Returns:
+        dict: Arrays with the new 'next_review'
+    """
+    interval = np.maximum(arrays['next_review'] - arrays['last_review'], 0)
+    new_interval = get_scheduler(algorithm).intervals(arrays['familiarity'], interval)
+    next_review = arrays['last_review'] + new_interval
+    if 'is_new' in arrays:
+        next_review = np.where(arrays['is_new'], arrays['next_review'], next_review)
+    return {**arrays, 'next_review': next_review}
+
+def rebalance_overdue(arrays, today, spread_days=7):
+    """
+    Spread a backlog of overdue cards over the coming days (e.g. after an absence)
+
+    The most urgent cards (lowest familiarity, then most overdue) stay due today;
+    the rest are spread evenly over spread_days so no single day is flooded.
+
+    Args:
+        arrays (dict): Card arrays (see cards_to_arrays)
+        today (int): Today's day number
+        spread_days (int): Number of days to spread the backlog over
+
+    Returns:
+        dict: Arrays with the new 'next_review'
+    """
+    next_review = arrays['next_review'].copy()
+    overdue = np.flatnonzero(next_review < today)
+    if len(overdue) == 0:
+        return {**arrays, 'next_review': next_review}
+    order = overdue[np.lexsort((next_review[overdue], arrays['familiarity'][overdue]))]
+    per_day = -(-len(order) // max(spread_days, 1))
+    next_review[order] = today + np.arange(len(order)) // per_day
+    return {**arrays, 'next_review': next_review}
@@ -0,0 +1,281 @@
+# SRS Simulation and Benchmark Harness
+#
+# Usage:
+#   python -m utils.srs_simulation --users 20 --words 500 --days 60 --algorithm buckets
+#
+# Synthesizes users x words x days of reviews against a throwaway word bank and
+# SRS store, driving the real srs_engine API under a simulated clock. Reports
+# per-operation latency percentiles, bytes written, and retention curves, so
+# scheduler changes can be checked for both speed and learning outcomes.
+
+import argparse
+import csv
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import srs_engine
+from utils.srs_store import SRSStore
+from utils.srs_scheduler import DEFAULT_ALGORITHM, GRADE_AGAIN, GRADE_GOOD, GRADE_EASY, GRADE_PERFECT
+from utils.review_session import ReviewSession
+
+class ConstantRecall:
+    """Every review is recalled with the same probability"""
+
+    name = 'constant'
+
+    def __init__(self, n_users, n_words, rng, probability=0.85):
+        self.probability = probability
+        self.rng = rng
+
+    def recall_probability(self, user, words, day):
+        return np.full(len(words), self.probability)
+
+    def review(self, user, words, day, recalled):
+        pass
+
+    def retention(self, day):
+        return self.probability
+
+class ExponentialRecall:
+    """
+    Forgetting-curve learners: recall = exp(-days since last review / stability)
+
+    Each (user, word) has a hidden memory stability drawn around the word's
+    difficulty. A successful review multiplies it, a lapse shrinks it.
+    """
+
+    name = 'exponential'
+    SUCCESS_GROWTH = 2.2
+    LAPSE_FACTOR = 0.5
+
+    def __init__(self, n_users, n_words, rng, initial_stability=1.5):
+        self.rng = rng
+        difficulty = rng.lognormal(0.0, 0.5, n_words)
+        self.stability = initial_stability / difficulty[None, :] * rng.lognormal(0.0, 0.3, (n_users, n_words))
+        self.last_seen = np.full((n_users, n_words), -1, dtype=np.int64)
+
+    def recall_probability(self, user, words, day):
+        seen = self.last_seen[user, words]
+        elapsed = np.where(seen < 0, 0, day - seen)
+        probability = np.exp(-elapsed / self.stability[user, words])
+        # A word never studied before is unknown
+        return np.where(seen < 0, 0.3, probability)
+
+    def review(self, user, words, day, recalled):
+        factor = np.where(recalled, self.SUCCESS_GROWTH, self.LAPSE_FACTOR)
+        self.stability[user, words] = np.maximum(self.stability[user, words] * factor, 0.5)
+        self.last_seen[user, words] = day
+
+    def retention(self, day):
+        """Mean recall probability today over every card studied at least once"""
+        seen = self.last_seen >= 0
+        if not seen.any():
+            return None
+        elapsed = day - self.last_seen[seen]
+        return float(np.exp(-elapsed / self.stability[seen]).mean())
+
+RECALL_MODELS = {
+    'constant': ConstantRecall,
+    'exponential': ExponentialRecall
+}
+
+def _grade(recalled, probability):
+    """Grade a review the way a learner would press the buttons"""
+    if not recalled:
+        return GRADE_AGAIN
+    if probability > 0.95:
+        return GRADE_PERFECT
+    if probability > 0.8:
+        return GRADE_EASY
+    return GRADE_GOOD
+
+def _bytes_written():
+    """Bytes this process has passed to write() so far (Linux), or None"""
+    try:
+        with open('/proc/self/io', 'r') as f:
+            for line in f:
+                if line.startswith('wchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+def _percentiles(samples):
+    if not samples:
+        return None
+    values = np.array(samples) * 1000.0
+    return {
+        'count': len(samples),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p90_ms': float(np.percentile(values, 90)),
+        'p99_ms': float(np.percentile(values, 99)),
+        'max_ms': float(values.max())
+    }
+
+def write_word_bank(path, n_words):
+    """Write a synthetic word bank CSV with n_words words"""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['word', 'translation', 'example', 'audio', 'tags', 'familiarity'])
+        for i in range(n_words):
+            writer.writerow([f'słowo{i}', f'word{i}', f'To jest słowo{i}.', '', f'tag{i % 8}', 1])
+
+def run_simulation(n_users=10, n_words=200, n_days=30, reviews_per_day=20, recall_model='exponential',
+                   algorithm=DEFAULT_ALGORITHM, seed=0, work_dir=None, progress=None, use_sessions=False):
+    """
+    Simulate learners reviewing through the real srs_engine API
+
+    Args:
+        n_users (int): Number of simulated users
+        n_words (int): Words in the synthetic word bank
+        n_days (int): Days to simulate
+        reviews_per_day (int): Cards each user reviews per day (the top of their due queue)
+        recall_model (str): 'exponential' or 'constant'
+        algorithm (str): Scheduling algorithm passed to update_familiarity
+        seed (int): Random seed
+        work_dir (str): Directory for the word bank and store (default: a temp dir, removed afterwards)
+        progress (callable): Optional function called with (day, summary of that day)
+        use_sessions (bool): Grade through a buffered ReviewSession per user and day
+            (timed as 'session_grade' and 'session_close') instead of update_familiarity
+
+    Returns:
+        dict: {'config', 'latency' (per operation), 'bytes_written', 'db_bytes',
+               'retention' (per day: recall rate of reviews and model retention), 'wall_seconds'}
+    """
+    rng = np.random.default_rng(seed)
+    owns_dir = work_dir is None
+    work_dir = work_dir or tempfile.mkdtemp(prefix='srs_sim_')
+    word_bank_path = os.path.join(work_dir, 'word_bank.csv')
+    write_word_bank(word_bank_path, n_words)
+    store = SRSStore(os.path.join(work_dir, 'srs.db'))
+    model = RECALL_MODELS[recall_model](n_users, n_words, rng)
+    word_index = {f'słowo{i}': i for i in range(n_words)}
+    user_ids = [f'sim{u}' for u in range(n_users)]
+
+    timings = {'get_words_for_review': [], 'calculate_next_review': [], 'update_familiarity': [],
+               'count_words_due': [], 'get_learning_stats': [], 'session_grade': [], 'session_close': []}
+    retention = []
+    start_day = datetime(2030, 1, 1, 9, 0)
+    bytes_before = _bytes_written()
+    wall_start = time.perf_counter()
+    try:
+        for day in range(n_days):
+            srs_engine.set_clock(lambda day=day: start_day + timedelta(days=day))
+            reviewed = 0
+            recalled_total = 0
+            for u, user_id in enumerate(user_ids):
+                t = time.perf_counter()
+                srs_engine.count_words_due(word_bank_path, user_id, store)
+                timings['count_words_due'].append(time.perf_counter() - t)
+
+                t = time.perf_counter()
+                due = srs_engine.get_words_for_review(word_bank_path, reviews_per_day, user_id, store)
+                timings['get_words_for_review'].append(time.perf_counter() - t)
+                if len(due) == 0:
+                    continue
+
+                words = np.array([word_index[word] for word in due['word']])
+                probability = model.recall_probability(u, words, day)
+                recalled = rng.random(len(words)) < probability
+                # The single-card scheduling call on its own, without the store write
+                for familiarity, ok in zip(due['familiarity'], recalled):
+                    t = time.perf_counter()
+                    srs_engine.calculate_next_review(int(familiarity), None, bool(ok))
+                    timings['calculate_next_review'].append(time.perf_counter() - t)
+                if use_sessions:
+                    session = ReviewSession(user_id, word_bank_path, store, algorithm, flush_interval=0,
+                                            journal_dir=os.path.join(work_dir, 'journal'))
+                    for word, ok, p in zip(due['word'], recalled, probability):
+                        t = time.perf_counter()
+                        session.grade(word, _grade(ok, p))
+                        timings['session_grade'].append(time.perf_counter() - t)
+                    t = time.perf_counter()
+                    session.close()
+                    timings['session_close'].append(time.perf_counter() - t)
+                else:
+                    for word, ok, p in zip(due['word'], recalled, probability):
+                        t = time.perf_counter()
+                        srs_engine.update_familiarity(word, bool(ok), word_bank_path, user_id, store,
+                                                      grade=_grade(ok, p), algorithm=algorithm)
+                        timings['update_familiarity'].append(time.perf_counter() - t)
+                model.review(u, words, day, recalled)
+                reviewed += len(words)
+                recalled_total += int(recalled.sum())
+
+                t = time.perf_counter()
+                srs_engine.get_learning_stats(word_bank_path, user_id, store)
+                timings['get_learning_stats'].append(time.perf_counter() - t)
+
+            summary = {
+                'day': day,
+                'reviews': reviewed,
+                'recall_rate': recalled_total / reviewed if reviewed else None,
+                'retention': model.retention(day)
+            }
+            retention.append(summary)
+            if progress:
+                progress(day, summary)
+        bytes_after = _bytes_written()
+        db_bytes = sum(
+            os.path.getsize(os.path.join(work_dir, name))
+            for name in os.listdir(work_dir) if name.startswith('srs.db')
+        )
+    finally:
+        srs_engine.set_clock(None)
+        store.close()
+        if owns_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'config': {
+            'users': n_users, 'words': n_words, 'days': n_days, 'reviews_per_day': reviews_per_day,
+            'recall_model': recall_model, 'algorithm': algorithm, 'seed': seed, 'use_sessions': use_sessions
+        },
+        'latency': {name: _percentiles(samples) for name, samples in timings.items()},
+        'bytes_written': (bytes_after - bytes_before) if bytes_before is not None and bytes_after is not None else None,
+        'db_bytes': db_bytes,
+        'retention': retention,
+        'wall_seconds': time.perf_counter() - wall_start
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate and benchmark the SRS engine")
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--words', type=int, default=200)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--reviews-per-day', type=int, default=20)
+    parser.add_argument('--recall-model', choices=sorted(RECALL_MODELS), default='exponential')
+    parser.add_argument('--algorithm', default=DEFAULT_ALGORITHM, help="buckets, sm2 or fsrs")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sessions', action='store_true', help="Grade through buffered review sessions")
+    parser.add_argument('--output', help="Write the full report as JSON")
+    args = parser.parse_args(argv)
+
+    report = run_simulation(args.users, args.words, args.days, args.reviews_per_day,
+                            args.recall_model, args.algorithm, args.seed, use_sessions=args.sessions)
+    print(f"Simulated {args.users} users x {args.words} words x {args.days} days "
+          f"({args.algorithm}, {args.recall_model} recall) in {report['wall_seconds']:.1f}s")
+    for name, stats in report['latency'].items():
+        if stats:
+            print(f"{name:>22}: p50 {stats['p50_ms']:.3f} ms  p90 {stats['p90_ms']:.3f} ms  "
+                  f"p99 {stats['p99_ms']:.3f} ms  ({stats['count']} calls)")
+    if report['bytes_written'] is not None:
+        print(f"Bytes written: {report['bytes_written']:,} (database now {report['db_bytes']:,} bytes)")
+    for row in report['retention'][::max(1, args.days // 10)]:
+        recall = f"{row['recall_rate']:.2f}" if row['recall_rate'] is not None else "-"
+        kept = f"{row['retention']:.2f}" if row['retention'] is not None else "-"
+        print(f"day {row['day']:>3}: {row['reviews']:>5} reviews, recall rate {recall}, retention {kept}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+
+if __name__ == '__main__':
+    main()
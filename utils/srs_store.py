@@ -0,0 +1,162 @@
+# SRS Store Module
+#
+# Per-user spaced repetition state in SQLite (WAL mode), one row per
+# (user, word). A review updates its own row in a short transaction instead of
+# rewriting the word bank, concurrent sessions do not overwrite each other, and
+# batches of reviews are committed together.
+#
+# The word bank CSV stays the source of the vocabulary; a user's cards are
+# seeded from it (with its familiarity column) the first time they are used.
+
+import csv
+import os
+import sqlite3
+import threading
+
+SRS_DB_PATH = 'data/srs.db'
+DEFAULT_SRS_USER = 'default'
+BUSY_TIMEOUT_MS = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cards (
+    user_id TEXT NOT NULL,
+    word TEXT NOT NULL,
+    familiarity INTEGER NOT NULL,
+    last_review TEXT,
+    next_review TEXT,
+    PRIMARY KEY (user_id, word)
+) WITHOUT ROWID;
+-- Due cards are served from the in-memory DueQueue, so no due-date index is kept
+DROP INDEX IF EXISTS cards_due;
+"""
+
+CARD_FIELDS = ('word', 'familiarity', 'last_review', 'next_review')
+
+class SRSStore:
+    """
+    Transactional store of SRS cards keyed by (user, word).
+
+    Each thread gets its own SQLite connection (Streamlit runs sessions on
+    separate threads). Dates are stored as 'YYYY-MM-DD' strings, so they sort
+    and compare as text; a card with no next_review is due now.
+    """
+
+    def __init__(self, db_path=SRS_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._seeded = set()  # (user_id, word_bank_path, mtime) already seeded
+        self._seed_lock = threading.Lock()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_MS / 1000)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def ensure_user(self, user_id, word_bank_path='data/word_bank.csv'):
+        """
+        Seed a user's cards from the word bank (words they do not have yet)
+
+        Runs once per user and word bank version; later calls are a set lookup.
+
+        Args:
+            user_id (str): User's ID or username
+            word_bank_path (str): Path to word bank CSV
+
+        Returns:
+            int: Number of cards added
+        """
+        try:
+            mtime = os.path.getmtime(word_bank_path)
+        except OSError:
+            return 0
+        marker = (user_id, word_bank_path, mtime)
+        if marker in self._seeded:
+            return 0
+        with self._seed_lock:
+            if marker in self._seeded:
+                return 0
+            with open(word_bank_path, newline='', encoding='utf-8') as f:
+                rows = [(user_id, row['word'], int(float(row.get('familiarity') or 1)))
+                        for row in csv.DictReader(f) if row.get('word')]
+            conn = self._connect()
+            before = conn.total_changes
+            with conn:
+                conn.executemany(
+                    'INSERT OR IGNORE INTO cards (user_id, word, familiarity) VALUES (?, ?, ?)', rows
+                )
+            self._seeded.add(marker)
+            return conn.total_changes - before
+
+    def get_card(self, user_id, word):
+        """
+        Get one card
+
+        Returns:
+            dict: {'word', 'familiarity', 'last_review', 'next_review'} or None
+        """
+        row = self._connect().execute(
+            'SELECT word, familiarity, last_review, next_review FROM cards WHERE user_id = ? AND word = ?',
+            (user_id, word)
+        ).fetchone()
+        return dict(zip(CARD_FIELDS, row)) if row else None
+
+    def get_cards(self, user_id):
+        """
+        Get all of a user's cards
+
+        Returns:
+            list: Card dicts (see get_card)
+        """
+        rows = self._connect().execute(
+            'SELECT word, familiarity, last_review, next_review FROM cards WHERE user_id = ?', (user_id,)
+        ).fetchall()
+        return [dict(zip(CARD_FIELDS, row)) for row in rows]
+
+    def apply_reviews(self, reviews):
+        """
+        Write many reviewed cards in one transaction
+
+        Args:
+            reviews (iterable): (user_id, word, familiarity, last_review, next_review) tuples
+
+        Returns:
+            int: Number of cards written
+        """
+        reviews = list(reviews)
+        if not reviews:
+            return 0
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                'INSERT INTO cards (user_id, word, familiarity, last_review, next_review) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (user_id, word) DO UPDATE SET familiarity = excluded.familiarity, '
+                'last_review = excluded.last_review, next_review = excluded.next_review',
+                reviews
+            )
+        return len(reviews)
+
+    def users(self):
+        """
+        Get every user with cards
+
+        Returns:
+            list: User IDs
+        """
+        return [row[0] for row in self._connect().execute('SELECT DISTINCT user_id FROM cards')]
+
+    def close(self):
+        """Close this thread's connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+srs_store = SRSStore()
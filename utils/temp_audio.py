@@ -0,0 +1,168 @@
+# Temporary Audio File Lifecycle Module
+
+import os
+import tempfile
+import threading
+import time
+
+TEMP_AUDIO_DIR = os.path.join(tempfile.gettempdir(), 'a1_voice_tutor')
+TEMP_AUDIO_TTL_SECONDS = 60 * 60
+TEMP_AUDIO_MAX_BYTES = 100 * 1024 * 1024
+REAP_INTERVAL_SECONDS = 5 * 60
+# Files younger than this are never removed to meet the disk ceiling: they may
+# still be in use (a TTS render being written, a recording being decoded)
+TEMP_AUDIO_GRACE_SECONDS = 2 * 60
+
+class TempAudioRegistry:
+    """
+    Registry of the temporary audio files this app creates.
+
+    Every file is tracked with its creation time. A background
+    reaper deletes files older than the TTL and, if the tracked files exceed the
+    disk ceiling, the oldest ones first, sparing files still in their grace period.
+    Cleanup only ever touches tracked files, so it costs time proportional to our
+    own files and never removes files that belong to other programs.
+    """
+
+    def __init__(self, base_dir=TEMP_AUDIO_DIR, ttl_seconds=TEMP_AUDIO_TTL_SECONDS,
+                 max_bytes=TEMP_AUDIO_MAX_BYTES, reap_interval=REAP_INTERVAL_SECONDS,
+                 grace_seconds=TEMP_AUDIO_GRACE_SECONDS):
+        self.base_dir = base_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.reap_interval = reap_interval
+        self.grace_seconds = grace_seconds
+        self._files = {}  # path -> created_at
+        self._lock = threading.Lock()
+        self._reaper = None
+
+    def create(self, suffix='.wav', directory=None, prefix='tmp', data=None):
+        """
+        Create and track a temporary file
+
+        Args:
+            suffix (str): File suffix
+            directory (str): Directory for the file (default: the registry's own)
+            prefix (str): File name prefix
+            data (bytes-like): Optional contents to write
+
+        Returns:
+            str: Path of the new file
+        """
+        directory = directory or self.base_dir
+        os.makedirs(directory, exist_ok=True)
+        fd, path = tempfile.mkstemp(suffix=suffix, prefix=prefix, dir=directory)
+        with os.fdopen(fd, 'wb') as f:
+            if data is not None:
+                f.write(data)
+        self.register(path)
+        return path
+
+    def register(self, path):
+        """Track an existing file so it is reaped with the others"""
+        with self._lock:
+            self._files[path] = time.time()
+        self._ensure_reaper()
+
+    def forget(self, path):
+        """Stop tracking a file that was moved or handed over elsewhere (it is not deleted)"""
+        with self._lock:
+            self._files.pop(path, None)
+
+    def release(self, path):
+        """Delete a tracked file now"""
+        self.forget(path)
+        _remove_quietly(path)
+
+    def release_all(self):
+        """
+        Delete every tracked file
+
+        Returns:
+            int: Number of files removed
+        """
+        with self._lock:
+            paths = list(self._files)
+            self._files.clear()
+        for path in paths:
+            _remove_quietly(path)
+        return len(paths)
+
+    def reap(self, now=None):
+        """
+        Delete expired files, then the oldest ones while over the disk ceiling
+
+        Files created within the grace period are kept even over the ceiling,
+        so a render or recording still in use is never pulled away.
+
+        Returns:
+            int: Number of files removed
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            entries = sorted(self._files.items(), key=lambda item: item[1])
+        removed = []
+        live = []
+        for path, created_at in entries:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                removed.append(path)  # Already gone (moved or deleted by its owner)
+                continue
+            if now - created_at > self.ttl_seconds:
+                removed.append(path)
+            else:
+                live.append((path, size, created_at))
+        total = sum(size for _, size, _ in live)
+        for path, size, created_at in live:
+            if total <= self.max_bytes or now - created_at < self.grace_seconds:
+                break  # Oldest first, so every remaining file is within the grace period too
+            removed.append(path)
+            total -= size
+        with self._lock:
+            for path in removed:
+                self._files.pop(path, None)
+        for path in removed:
+            _remove_quietly(path)
+        return len(removed)
+
+    def stats(self):
+        """
+        Get usage of tracked files
+
+        Returns:
+            dict: Number of tracked files and their total size in bytes
+        """
+        with self._lock:
+            paths = list(self._files)
+        total = 0
+        for path in paths:
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                pass
+        return {'files': len(paths), 'bytes': total, 'max_bytes': self.max_bytes}
+
+    def _ensure_reaper(self):
+        if self._reaper is not None and self._reaper.is_alive():
+            return
+        with self._lock:
+            if self._reaper is None or not self._reaper.is_alive():
+                self._reaper = threading.Thread(target=self._reap_loop, name='temp-audio-reaper', daemon=True)
+                self._reaper.start()
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(self.reap_interval)
+            try:
+                self.reap()
+            except Exception as e:
+                print(f"Error reaping temp audio files: {e}")
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass  # Ignore errors when cleaning up
+
+temp_audio = TempAudioRegistry()
@@ -0,0 +1,27 @@
+# Text Utilities Module
+#
+# Normalization and sentence splitting shared by speech recognition, scoring,
+# the phoneme index and the audio pack, so every one of them keys texts the
+# same way.
+
+import re
+
+def normalize_text(text):
+    """
+    Normalize text for comparison and lookup
+
+    Lowercases, turns punctuation into spaces (so "dzień-dobry" is two words)
+    and collapses whitespace.
+
+    Args:
+        text (str): Text to normalize
+
+    Returns:
+        str: Normalized text
+    """
+    text = re.sub(r'[^\w\s]', ' ', str(text).lower())
+    return re.sub(r'\s+', ' ', text).strip()
+
+def split_sentences(text):
+    """Split a passage into sentences on ., ! and ?"""
+    return [s.strip() for s in re.split(r'(?<=[.!?])\s+', str(text)) if s.strip()]
@@ -0,0 +1,184 @@
+# TTS Worker Module
+
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import pyttsx3
+from utils.temp_audio import temp_audio
+from utils.audio_cache import RENDER_PREFIX
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+class TTSWorker:
+    """
+    Long-lived text-to-speech worker.
+
+    A single daemon thread owns the pyttsx3 engine and renders jobs from a priority
+    queue, so runAndWait never blocks the Streamlit script thread and the system
+    voice list is enumerated only once. pyttsx3.init() hands out one shared engine
+    per driver, so the worker keeps that engine and only re-applies voice, rate and
+    volume when a job's configuration differs from the previous one.
+
+    Jobs with the same key are deduplicated: submitting a key that is still queued
+    returns the existing future and, if the new request is more urgent, promotes it.
+    """
+
+    def __init__(self):
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._jobs = {}  # key -> pending job
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._engine = None
+        self._engine_config = None
+        self._polish_voice_id = None
+        self._metrics = {
+            'completed': 0,
+            'failed': 0,
+            'synthesis_seconds_total': 0.0,
+            'synthesis_seconds_max': 0.0,
+            'synthesis_seconds_last': None,
+            'queue_wait_seconds_total': 0.0
+        }
+
+    def submit(self, text, output_dir, voice_id="default", rate=150, volume=0.8,
+               priority=PRIORITY_INTERACTIVE, key=None, finalize=None):
+        """
+        Queue a synthesis job
+
+        Args:
+            text (str): Text to speak
+            output_dir (str): Directory for the rendered WAV file
+            voice_id (str): Voice id, or "default" for the first Polish voice
+            rate (int): Speech rate
+            volume (float): Volume level
+            priority (int): PRIORITY_INTERACTIVE or PRIORITY_BACKGROUND (lower runs first)
+            key (str): Optional job key used to deduplicate identical requests
+            finalize (callable): Optional function applied to the rendered path on the
+                worker thread; its return value becomes the future's result
+
+        Returns:
+            Future: Resolves to the rendered file path (or finalize's result)
+        """
+        with self._lock:
+            self._ensure_started()
+            job = self._jobs.get(key) if key is not None else None
+            if job is not None:
+                if priority < job['priority'] and not job['started']:
+                    job['priority'] = priority
+                    self._queue.put((priority, next(self._seq), job))
+                return job['future']
+            job = {
+                'key': key,
+                'text': text,
+                'output_dir': output_dir,
+                'config': (voice_id, rate, volume),
+                'priority': priority,
+                'finalize': finalize,
+                'future': Future(),
+                'started': False,
+                'submitted_at': time.perf_counter()
+            }
+            if key is not None:
+                self._jobs[key] = job
+            self._pending += 1
+            self._queue.put((priority, next(self._seq), job))
+            return job['future']
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='tts-worker', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        try:
+            # SAPI (Windows) needs COM initialized on the thread that drives it
+            import pythoncom
+            pythoncom.CoInitialize()
+        except ImportError:
+            pass
+        while True:
+            _, _, job = self._queue.get()
+            with self._lock:
+                # A promoted job leaves a stale entry behind; skip it
+                if job['started']:
+                    continue
+                job['started'] = True
+                self._pending -= 1
+            future = job['future']
+            if not future.set_running_or_notify_cancel():
+                self._forget(job)
+                continue
+            start = time.perf_counter()
+            try:
+                path = self._synthesize(job)
+                result = job['finalize'](path) if job['finalize'] else path
+            except Exception as e:
+                self._record(job, start, failed=True)
+                future.set_exception(e)
+            else:
+                self._record(job, start, failed=False)
+                future.set_result(result)
+
+    def _synthesize(self, job):
+        engine = self._engine_for(job['config'])
+        # Tracked until the caller moves it into place, so a failed render is reaped
+        path = temp_audio.create(suffix='.wav', directory=job['output_dir'], prefix=RENDER_PREFIX)
+        engine.save_to_file(job['text'], path)
+        engine.runAndWait()
+        return path
+
+    def _engine_for(self, config):
+        if self._engine is None:
+            self._engine = pyttsx3.init()
+            for voice in self._engine.getProperty('voices'):
+                if 'polish' in voice.name.lower() or 'pl' in voice.id.lower():
+                    self._polish_voice_id = voice.id
+                    break
+        if config != self._engine_config:
+            voice_id, rate, volume = config
+            if voice_id == "default":
+                voice_id = self._polish_voice_id
+            if voice_id:
+                self._engine.setProperty('voice', voice_id)
+            self._engine.setProperty('rate', rate)
+            self._engine.setProperty('volume', volume)
+            self._engine_config = config
+        return self._engine
+
+    def _forget(self, job):
+        with self._lock:
+            if job['key'] is not None and self._jobs.get(job['key']) is job:
+                del self._jobs[job['key']]
+
+    def _record(self, job, start, failed):
+        now = time.perf_counter()
+        synthesis_seconds = now - start
+        self._forget(job)
+        with self._lock:
+            self._metrics['failed' if failed else 'completed'] += 1
+            self._metrics['synthesis_seconds_total'] += synthesis_seconds
+            self._metrics['synthesis_seconds_max'] = max(self._metrics['synthesis_seconds_max'], synthesis_seconds)
+            self._metrics['synthesis_seconds_last'] = synthesis_seconds
+            self._metrics['queue_wait_seconds_total'] += start - job['submitted_at']
+
+    def metrics(self):
+        """
+        Get worker metrics
+
+        Returns:
+            dict: Queue depth, completed/failed counts and synthesis latency stats
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['queue_depth'] = self._pending
+        finished = metrics['completed'] + metrics['failed']
+        metrics['synthesis_seconds_avg'] = metrics['synthesis_seconds_total'] / finished if finished else None
+        metrics['queue_wait_seconds_avg'] = metrics['queue_wait_seconds_total'] / finished if finished else None
+        return metrics
+
+tts_worker = TTSWorker()
@@ -2,98 +2,669 @@
 
 import streamlit as st
 import speech_recognition as sr
-import pyttsx3
-import tempfile
 import os
 from io import BytesIO
-import wave
 from vosk import Model, KaldiRecognizer
 import json
+import csv
+import hashlib
+import numpy as np
+import struct
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from utils.audio_cache import tts_cache, make_tts_key
+from utils.tts_worker import tts_worker, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from utils.audio_pack import get_pack_audio
+from utils.temp_audio import temp_audio
+from utils.similarity import token_similarity, batch_similarity
+from utils.text_utils import normalize_text as _normalize_phrase
 
-def initialize_tts():
-    """Initialize text-to-speech engine"""
+DEFAULT_VOSK_MODEL_PATH = "models/vosk-pl"
+VOSK_SAMPLE_RATE = 16000
+
+# Process-wide Vosk model registry. A loaded Model is read-only and safe to
+# share between threads, so every Streamlit session reuses the same instance
+# and only creates its own (cheap) KaldiRecognizer.
+_vosk_models = {}
+_vosk_model_stats = {}
+_vosk_models_lock = threading.Lock()
+
+def _process_rss_bytes():
+    """Best-effort resident memory of this process in bytes, or None"""
     try:
-        engine = pyttsx3.init()
-        # Set properties for Polish voice if available
-        voices = engine.getProperty('voices')
-        for voice in voices:
-            if 'polish' in voice.name.lower() or 'pl' in voice.id.lower():
-                engine.setProperty('voice', voice.id)
-                break
-        engine.setProperty('rate', 150)  # Speed of speech
-        engine.setProperty('volume', 0.8)  # Volume level
-        return engine
+        import psutil
+        return psutil.Process().memory_info().rss
+    except Exception:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except Exception:
+        return None
+
+def get_vosk_model(model_path=DEFAULT_VOSK_MODEL_PATH):
+    """
+    Get the shared Vosk model for a path, loading it on first use
+
+    Args:
+        model_path (str): Path to the unpacked Vosk model directory
+
+    Returns:
+        Model: Loaded Vosk model (shared by all callers in this process)
+    """
+    model = _vosk_models.get(model_path)
+    if model is not None:
+        return model
+    with _vosk_models_lock:
+        # Another session may have finished loading while we waited
+        model = _vosk_models.get(model_path)
+        if model is None:
+            rss_before = _process_rss_bytes()
+            start = time.perf_counter()
+            model = Model(model_path)
+            load_seconds = time.perf_counter() - start
+            rss_after = _process_rss_bytes()
+            _vosk_model_stats[model_path] = {
+                'load_seconds': load_seconds,
+                'memory_bytes': (rss_after - rss_before) if rss_before is not None and rss_after is not None else None,
+                'loaded_at': time.time()
+            }
+            _vosk_models[model_path] = model
+    return model
+
+def warm_up_vosk_model(model_path=DEFAULT_VOSK_MODEL_PATH):
+    """
+    Load a Vosk model ahead of the first recording (e.g. at app start)
+
+    Args:
+        model_path (str): Path to the unpacked Vosk model directory
+
+    Returns:
+        bool: True if the model is loaded, False if it could not be loaded
+    """
+    if not os.path.isdir(model_path):
+        return False
+    try:
+        get_vosk_model(model_path)
+        return True
     except Exception as e:
-        st.error(f"Failed to initialize TTS engine: {e}")
+        print(f"Error warming up Vosk model: {e}")
+        return False
+
+def get_vosk_model_stats():
+    """
+    Get load metrics for every Vosk model loaded in this process
+
+    Returns:
+        dict: model_path -> {'load_seconds', 'memory_bytes', 'loaded_at'}
+    """
+    return {path: dict(stats) for path, stats in _vosk_model_stats.items()}
+
+DEFAULT_TTS_RATE = 150
+DEFAULT_TTS_VOLUME = 0.8
+TTS_TIMEOUT_SECONDS = 60
+
+def _cache_rendered_audio(key, rendered_path):
+    """Move a finished rendering into the TTS cache (runs on the TTS worker thread)"""
+    if os.path.getsize(rendered_path) == 0:
+        temp_audio.release(rendered_path)
         return None
+    cached_path = tts_cache.put(key, rendered_path)
+    temp_audio.forget(rendered_path)
+    return cached_path
+
+def _submit_tts(text, voice_id, rate, volume, priority):
+    """Queue a cache-filling render on the TTS worker; identical pending requests share one job"""
+    key = make_tts_key(text, voice_id, rate, volume)
+    return tts_worker.submit(
+        text, tts_cache.cache_dir, voice_id, rate, volume,
+        priority=priority, key=key,
+        finalize=lambda rendered_path: _cache_rendered_audio(key, rendered_path)
+    )
 
-def text_to_speech(text, voice_id="default"):
-    """Convert text to speech and return audio file path"""
+def _find_rendered_audio(key):
+    """Pre-rendered audio pack first, then the TTS cache"""
+    return get_pack_audio(key) or tts_cache.get(key)
+
+def text_to_speech(text, voice_id="default", rate=DEFAULT_TTS_RATE, volume=DEFAULT_TTS_VOLUME):
+    """Convert text to speech and return audio file path (served from the audio pack or cache when possible)"""
     try:
-        engine = initialize_tts()
-        if engine is None:
-            return None
-        
-        # Create temporary file for audio
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.wav')
-        temp_file.close()
-        
-        # Save speech to file
-        engine.save_to_file(text, temp_file.name)
-        engine.runAndWait()
-        
-        return temp_file.name
+        cached_path = _find_rendered_audio(make_tts_key(text, voice_id, rate, volume))
+        if cached_path:
+            return cached_path
+        future = _submit_tts(text, voice_id, rate, volume, PRIORITY_INTERACTIVE)
+        return future.result(timeout=TTS_TIMEOUT_SECONDS)
     except Exception as e:
         st.error(f"Text-to-speech error: {e}")
         return None
 
+def prerender_speech(text, voice_id="default", rate=DEFAULT_TTS_RATE, volume=DEFAULT_TTS_VOLUME):
+    """
+    Render speech into the TTS cache in the background without waiting
+
+    Args:
+        text (str): Text to render
+        voice_id (str): Voice identifier
+        rate (int): Speech rate
+        volume (float): Volume level
+
+    Returns:
+        Future: Resolves to the cached audio path, or None if already cached
+    """
+    if _find_rendered_audio(make_tts_key(text, voice_id, rate, volume)):
+        return None
+    return _submit_tts(text, voice_id, rate, volume, PRIORITY_BACKGROUND)
+
+def get_tts_metrics():
+    """
+    Get TTS worker and cache metrics
+
+    Returns:
+        dict: Worker queue depth and synthesis latency plus cache usage
+    """
+    return {'worker': tts_worker.metrics(), 'cache': tts_cache.stats()}
+
 def record_audio_streamlit():
-    """Record audio using Streamlit's audio input widget"""
+    """Record audio using Streamlit's audio input widget
+
+    Returns:
+        memoryview: The recorded WAV bytes (a view of the widget's buffer, no copy), or None
+    """
     st.write("🎤 Click the button below to record your voice:")
     
     # Use Streamlit's experimental audio input
     audio_bytes = st.audio_input("Record your pronunciation")
     
     if audio_bytes:
-        # Save audio to temporary file
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.wav')
-        temp_file.write(audio_bytes.getvalue())
-        temp_file.close()
-        return temp_file.name
+        return audio_bytes.getbuffer()
     
     return None
 
-def transcribe_audio_vosk(audio_file_path, model_path="models/vosk-pl"):
-    """Transcribe audio file to text using Vosk offline speech recognition"""
+def parse_wav(data):
+    """
+    Parse a RIFF/WAVE header once and locate the PCM samples without copying them
+
+    Args:
+        data (bytes-like): Complete WAV file contents
+
+    Returns:
+        tuple: (params dict with 'channels', 'sample_rate', 'sample_width',
+               'audio_format'; memoryview of the PCM data)
+    """
+    view = memoryview(data).cast('B')
+    if len(view) < 12 or view[0:4] != b'RIFF' or view[8:12] != b'WAVE':
+        raise ValueError("Not a RIFF/WAVE file")
+    params = None
+    offset = 12
+    while offset + 8 <= len(view):
+        chunk_id = view[offset:offset + 4].tobytes()
+        (chunk_size,) = struct.unpack_from('<I', view, offset + 4)
+        body = offset + 8
+        if chunk_id == b'fmt ':
+            audio_format, channels, sample_rate, _, _, bits = struct.unpack_from('<HHIIHH', view, body)
+            params = {
+                'audio_format': audio_format,
+                'channels': channels,
+                'sample_rate': sample_rate,
+                'sample_width': bits // 8
+            }
+        elif chunk_id == b'data':
+            if params is None:
+                raise ValueError("WAV data chunk before fmt chunk")
+            # Streamed recordings may leave the size as 0 or 0xFFFFFFFF
+            end = len(view) if chunk_size in (0, 0xFFFFFFFF) else min(body + chunk_size, len(view))
+            return params, view[body:end]
+        offset = body + chunk_size + (chunk_size & 1)
+    raise ValueError("WAV file has no data chunk")
+
+def load_audio(audio):
+    """
+    Get WAV parameters and PCM samples for a recording
+
+    Args:
+        audio: WAV bytes / bytearray / memoryview, a file-like object with
+               getbuffer(), or a path to a WAV file
+
+    Returns:
+        tuple: (params dict, memoryview of the PCM data) as from parse_wav
+    """
+    if isinstance(audio, (str, os.PathLike)):
+        with open(audio, 'rb') as f:
+            audio = f.read()
+    elif hasattr(audio, 'getbuffer'):
+        audio = audio.getbuffer()
+    return parse_wav(audio)
+
+WAVE_FORMAT_IEEE_FLOAT = 3
+
+def pcm_to_mono(params, pcm):
+    """
+    Decode PCM samples to a mono float32 signal in [-1, 1] (stereo is averaged)
+
+    Args:
+        params (dict): WAV parameters from parse_wav
+        pcm (bytes-like): Raw PCM data
+
+    Returns:
+        np.ndarray: Mono float32 samples
+    """
+    width = params['sample_width']
+    channels = params['channels']
+    if params['audio_format'] == WAVE_FORMAT_IEEE_FLOAT:
+        samples = np.frombuffer(pcm, dtype='<f4' if width == 4 else '<f8').astype(np.float32)
+    elif width == 1:
+        samples = (np.frombuffer(pcm, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(pcm, dtype='<i2').astype(np.float32) / 32768.0
+    elif width == 3:
+        raw = np.frombuffer(pcm, dtype=np.uint8)
+        raw = raw[:len(raw) - len(raw) % 3].reshape(-1, 3).astype(np.int32)
+        values = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        values = np.where(values >= 1 << 23, values - (1 << 24), values)
+        samples = values.astype(np.float32) / float(1 << 23)
+    elif width == 4:
+        samples = np.frombuffer(pcm, dtype='<i4').astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported sample width: {width}")
+    if channels > 1:
+        samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels).mean(axis=1)
+    return samples
+
+def resample_audio(signal, orig_rate, target_rate):
+    """
+    Resample a mono signal with an FFT (band-limited, so downsampling does not alias)
+
+    Args:
+        signal (np.ndarray): Mono float32 samples
+        orig_rate (int): Current sample rate
+        target_rate (int): Desired sample rate
+
+    Returns:
+        np.ndarray: Resampled float32 samples
+    """
+    if orig_rate == target_rate or len(signal) == 0:
+        return signal
+    n_out = int(round(len(signal) * target_rate / orig_rate))
+    spectrum = np.fft.rfft(signal)
+    n_bins = n_out // 2 + 1
+    if n_bins <= len(spectrum):
+        spectrum = spectrum[:n_bins]
+    else:
+        spectrum = np.pad(spectrum, (0, n_bins - len(spectrum)))
+    return (np.fft.irfft(spectrum, n_out) * (n_out / len(signal))).astype(np.float32)
+
+def trim_silence(signal, sample_rate, frame_ms=20, threshold_db=-35.0, floor_db=-55.0, pad_ms=150):
+    """
+    Trim leading and trailing non-speech with an energy-based VAD
+
+    A frame counts as speech when its RMS level is within threshold_db of the
+    loudest frame and above the absolute floor_db. pad_ms of context is kept
+    around the detected speech so word onsets are not clipped.
+
+    Args:
+        signal (np.ndarray): Mono float32 samples
+        sample_rate (int): Sample rate of the signal
+        frame_ms (int): VAD frame length in milliseconds
+        threshold_db (float): Speech threshold relative to the loudest frame
+        floor_db (float): Absolute speech threshold (dBFS)
+        pad_ms (int): Context kept before and after speech
+
+    Returns:
+        np.ndarray: Trimmed samples (empty if no speech was found)
+    """
+    frame_len = max(1, int(sample_rate * frame_ms / 1000))
+    n_frames = len(signal) // frame_len
+    if n_frames == 0:
+        return signal
+    frames = signal[:n_frames * frame_len].reshape(n_frames, frame_len)
+    level_db = 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-12)
+    speech = np.flatnonzero(level_db > max(level_db.max() + threshold_db, floor_db))
+    if len(speech) == 0:
+        return signal[:0]
+    pad = int(sample_rate * pad_ms / 1000)
+    start = max(0, speech[0] * frame_len - pad)
+    end = min(len(signal), (speech[-1] + 1) * frame_len + pad)
+    return signal[start:end]
+
+def preprocess_audio(params, pcm, target_rate=VOSK_SAMPLE_RATE, trim=True):
+    """
+    Prepare a recording for the recognizer: downmix, resample and trim silence
+
+    Args:
+        params (dict): WAV parameters from parse_wav
+        pcm (bytes-like): Raw PCM data
+        target_rate (int): Sample rate expected by the model
+        trim (bool): Whether to trim leading/trailing silence
+
+    Returns:
+        np.ndarray: 16-bit mono samples at target_rate
+    """
+    signal = pcm_to_mono(params, pcm)
+    signal = resample_audio(signal, params['sample_rate'], target_rate)
+    if trim:
+        signal = trim_silence(signal, target_rate)
+    return (np.clip(signal, -1.0, 1.0) * 32767.0).astype('<i2')
+
+def iter_pcm_chunks(pcm, chunk_bytes):
+    """Yield consecutive memoryview slices of a PCM buffer"""
+    for start in range(0, len(pcm), chunk_bytes):
+        yield pcm[start:start + chunk_bytes]
+
+# Constrained (grammar) recognition for expected-phrase checks.
+# Creating a KaldiRecognizer with a grammar compiles a small decoding graph, so
+# idle recognizers are pooled per (model, sample rate, grammar) and Reset()
+# between uses. A recognizer is stateful, so each one serves one decode at a time.
+MAX_POOLED_GRAMMARS = 256
+MAX_IDLE_RECOGNIZERS = 4
+_recognizer_pool = OrderedDict()
+_recognizer_pool_lock = threading.Lock()
+
+def _acquire_recognizer(model_path, sample_rate, grammar=None):
+    key = (model_path, sample_rate, grammar)
+    with _recognizer_pool_lock:
+        idle = _recognizer_pool.get(key)
+        if idle:
+            _recognizer_pool.move_to_end(key)
+            return key, idle.pop()
+    model = get_vosk_model(model_path)
+    if grammar is None:
+        rec = KaldiRecognizer(model, sample_rate)
+    else:
+        rec = KaldiRecognizer(model, sample_rate, grammar)
+    # Ask for per-word start/end/confidence in every result
+    rec.SetWords(True)
+    return key, rec
+
+def _release_recognizer(key, rec):
+    rec.Reset()
+    with _recognizer_pool_lock:
+        idle = _recognizer_pool.setdefault(key, [])
+        _recognizer_pool.move_to_end(key)
+        if len(idle) < MAX_IDLE_RECOGNIZERS:
+            idle.append(rec)
+        while len(_recognizer_pool) > MAX_POOLED_GRAMMARS:
+            _recognizer_pool.popitem(last=False)
+
+_word_bank_words = {}
+
+def _load_word_bank_words(word_bank_path):
+    """Word bank vocabulary, re-read only when the CSV changes"""
+    mtime = os.path.getmtime(word_bank_path)
+    cached = _word_bank_words.get(word_bank_path)
+    if cached is None or cached[0] != mtime:
+        with open(word_bank_path, newline='', encoding='utf-8') as f:
+            words = sorted({_normalize_phrase(row['word']) for row in csv.DictReader(f) if row.get('word')})
+        cached = (mtime, tuple(words))
+        _word_bank_words[word_bank_path] = cached
+    return cached[1]
+
+@lru_cache(maxsize=1024)
+def _build_grammar(expected, vocabulary, max_confusables):
+    phrases = [expected] + expected.split()
+    for word in expected.split():
+        scores = batch_similarity(word, vocabulary)
+        ranked = sorted((score, other) for score, other in zip(scores, vocabulary) if other != word and score >= 0.5)
+        phrases.extend(other for _, other in ranked[::-1][:max_confusables])
+    phrases.append('[unk]')
+    return json.dumps(list(dict.fromkeys(p for p in phrases if p)), ensure_ascii=False)
+
+def build_expected_grammar(expected_text, word_bank_path='data/word_bank.csv', max_confusables=3):
+    """
+    Build a Vosk grammar for checking an expected phrase
+
+    The grammar holds the whole phrase, its single words, word-bank words that
+    look similar to each of them (so a wrong answer is recognized as that word
+    rather than forced onto the expected one) and [unk] for anything else.
+
+    Args:
+        expected_text (str): Phrase the learner is asked to say
+        word_bank_path (str): Word bank CSV used for confusable words
+        max_confusables (int): Similar words added per expected word
+
+    Returns:
+        str: JSON grammar for KaldiRecognizer
+    """
+    try:
+        vocabulary = _load_word_bank_words(word_bank_path)
+    except (OSError, KeyError):
+        vocabulary = ()
+    return _build_grammar(_normalize_phrase(expected_text), vocabulary, max_confusables)
+
+def iter_transcription_vosk(audio_chunks, sample_rate, model_path=DEFAULT_VOSK_MODEL_PATH, grammar=None):
+    """
+    Incrementally transcribe a stream of PCM chunks with Vosk
+
+    Args:
+        audio_chunks (iterable): 16-bit mono PCM byte chunks, in arrival order
+        sample_rate (int): Sample rate of the audio
+        model_path (str): Path to the Vosk model directory
+        grammar (str): Optional JSON phrase list restricting the vocabulary
+            (see build_expected_grammar); None decodes with the full model
+
+    Yields:
+        dict: {'type': 'partial', 'text': str} whenever the running hypothesis
+              changes, and {'type': 'final', 'text': str, 'result': dict} for
+              every finalized segment (the last one comes from FinalResult)
+    """
+    pool_key, rec = _acquire_recognizer(model_path, sample_rate, grammar)
+    try:
+        last_partial = ''
+        for chunk in audio_chunks:
+            if len(chunk) == 0:
+                continue
+            # The cffi binding only takes bytes, so each small slice is copied at the boundary
+            if rec.AcceptWaveform(bytes(chunk)):
+                result = json.loads(rec.Result())
+                last_partial = ''
+                yield {'type': 'final', 'text': result.get('text', ''), 'result': result}
+            else:
+                partial = json.loads(rec.PartialResult()).get('partial', '')
+                if partial != last_partial:
+                    last_partial = partial
+                    yield {'type': 'partial', 'text': partial}
+        result = json.loads(rec.FinalResult())
+        yield {'type': 'final', 'text': result.get('text', ''), 'result': result}
+    finally:
+        _release_recognizer(pool_key, rec)
+
+def stream_transcribe_audio_vosk(audio, model_path=DEFAULT_VOSK_MODEL_PATH, chunk_frames=4000, preprocess=True, grammar=None):
+    """
+    Transcribe a WAV recording with Vosk, yielding partial and final results as they decode
+
+    Args:
+        audio: WAV as bytes-like data or a file path (see load_audio)
+        model_path (str): Path to the Vosk model directory
+        chunk_frames (int): Frames fed to the recognizer per step
+        preprocess (bool): Downmix, resample to VOSK_SAMPLE_RATE and trim silence
+            first; pass False only for audio that is already 16-bit mono
+        grammar (str): Optional JSON grammar (see build_expected_grammar)
+
+    Yields:
+        dict: Events as produced by iter_transcription_vosk
+    """
+    params, pcm = load_audio(audio)
+    if preprocess:
+        samples = preprocess_audio(params, pcm)
+        pcm = memoryview(samples).cast('B')
+        sample_rate = VOSK_SAMPLE_RATE
+        frame_bytes = 2
+    else:
+        sample_rate = params['sample_rate']
+        frame_bytes = params['sample_width'] * params['channels']
+    yield from iter_transcription_vosk(iter_pcm_chunks(pcm, chunk_frames * frame_bytes), sample_rate, model_path, grammar)
+
+# Columns of the word timing array in a detailed transcription
+WORD_START, WORD_END, WORD_CONF = 0, 1, 2
+
+def _collect_transcription(events, on_event=None):
+    """
+    Build a detailed transcription from a transcription event stream
+
+    Args:
+        events (iterable): Events from iter_transcription_vosk
+        on_event (callable): Optional function called with every event (e.g. captions)
+
+    Returns:
+        dict: {'text': str, 'words': tuple of str, 'timings': float32 array of
+               shape (n_words, 3) with columns WORD_START, WORD_END (seconds)
+               and WORD_CONF (0-1)}
+    """
+    texts = []
+    words = []
+    timings = []
+    for event in events:
+        if on_event:
+            on_event(event)
+        if event['type'] != 'final':
+            continue
+        if event['text']:
+            texts.append(event['text'])
+        for item in event['result'].get('result', []):
+            words.append(item['word'])
+            timings.append((item['start'], item['end'], item['conf']))
+    return {
+        'text': " ".join(texts).strip(),
+        'words': tuple(words),
+        'timings': np.array(timings, dtype=np.float32).reshape(-1, 3)
+    }
+
+# Results memoized by audio content, so Streamlit reruns that hand back the same
+# recording never decode it again. Bump PIPELINE_VERSION whenever preprocessing
+# or decoding changes in a way that changes transcripts.
+PIPELINE_VERSION = 2
+AUDIO_RESULT_CACHE_SIZE = 256
+_audio_result_cache = OrderedDict()
+_audio_result_cache_lock = threading.Lock()
+
+def audio_fingerprint(audio):
+    """
+    Content hash of a recording
+
+    Args:
+        audio: WAV bytes-like data, a file-like object with getbuffer(), or a file path
+
+    Returns:
+        str: SHA-256 hex digest of the audio bytes
+    """
+    if isinstance(audio, (str, os.PathLike)):
+        digest = hashlib.sha256()
+        with open(audio, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 16), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    if hasattr(audio, 'getbuffer'):
+        audio = audio.getbuffer()
+    return hashlib.sha256(audio).hexdigest()
+
+def cached_audio_result(kind, audio, params, compute):
+    """
+    Memoize a result derived from a recording
+
+    Args:
+        kind (str): Result namespace, e.g. 'transcript' or 'analysis'
+        audio: Recording (see audio_fingerprint)
+        params (tuple): Everything else the result depends on (hashable)
+        compute (callable): Produces the result; raise to skip caching
+
+    Returns:
+        The cached or freshly computed result
+    """
+    key = (kind, audio_fingerprint(audio), PIPELINE_VERSION, params)
+    with _audio_result_cache_lock:
+        if key in _audio_result_cache:
+            _audio_result_cache.move_to_end(key)
+            return _audio_result_cache[key]
+    result = compute()
+    with _audio_result_cache_lock:
+        _audio_result_cache[key] = result
+        while len(_audio_result_cache) > AUDIO_RESULT_CACHE_SIZE:
+            _audio_result_cache.popitem(last=False)
+    return result
+
+def _transcript_params(model_path, grammar):
+    return (model_path, hashlib.sha1(grammar.encode('utf-8')).hexdigest() if grammar else None)
+
+def transcribe_audio_detailed(audio, expected_text=None, model_path=DEFAULT_VOSK_MODEL_PATH):
+    """
+    Transcribe a recording and keep Vosk's per-word timings and confidences
+
+    Args:
+        audio: WAV bytes or path to audio file
+        expected_text (str): Optional expected phrase for constrained decoding
+        model_path (str): Path to the Vosk model directory
+
+    Returns:
+        dict: Detailed transcription (see _collect_transcription); memoized by
+              audio content. Raises on decoding errors.
+    """
+    grammar = build_expected_grammar(expected_text) if expected_text else None
+    return cached_audio_result(
+        'transcript', audio, _transcript_params(model_path, grammar),
+        lambda: _collect_transcription(stream_transcribe_audio_vosk(audio, model_path, grammar=grammar))
+    )
+
+def transcribe_audio_vosk(audio, model_path=DEFAULT_VOSK_MODEL_PATH, grammar=None):
+    """Transcribe a recording (WAV bytes or file path) to text using Vosk offline speech recognition"""
+    try:
+        return cached_audio_result(
+            'transcript', audio, _transcript_params(model_path, grammar),
+            lambda: _collect_transcription(stream_transcribe_audio_vosk(audio, model_path, grammar=grammar))
+        )['text']
+    except Exception as e:
+        return f"Vosk transcription error: {e}"
+
+def transcribe_audio_live(audio, placeholder):
+    """
+    Transcribe audio while rendering live captions into a Streamlit placeholder
+
+    Args:
+        audio: WAV bytes or path to audio file
+        placeholder: Streamlit container from st.empty()
+
+    Returns:
+        str: Final transcript, or an error message
+    """
+    segments = []
+
+    def show_caption(event):
+        if event['type'] == 'final':
+            if event['text']:
+                segments.append(event['text'])
+            caption = " ".join(segments)
+        else:
+            caption = " ".join(segments + [event['text']])
+        placeholder.caption(f"🎧 {caption}…")
+
     try:
-        model = Model(model_path)
-        wf = wave.open(audio_file_path, "rb")
-        rec = KaldiRecognizer(model, wf.getframerate())
-        results = []
-        while True:
-            data = wf.readframes(4000)
-            if len(data) == 0:
-                break
-            if rec.AcceptWaveform(data):
-                results.append(json.loads(rec.Result()))
-        results.append(json.loads(rec.FinalResult()))
-        transcript = " ".join([r.get("text", "") for r in results])
-        return transcript.strip()
+        return cached_audio_result(
+            'transcript', audio, _transcript_params(DEFAULT_VOSK_MODEL_PATH, None),
+            lambda: _collect_transcription(stream_transcribe_audio_vosk(audio), on_event=show_caption)
+        )['text']
     except Exception as e:
         return f"Vosk transcription error: {e}"
+    finally:
+        placeholder.empty()
 
+def transcribe_audio(audio, expected_text=None):
+    """Transcribe a recording (WAV bytes or file path) to text using Vosk (offline)
 
-def transcribe_audio(audio_file_path):
-    """Transcribe audio file to text using Vosk (offline)"""
-    return transcribe_audio_vosk(audio_file_path)
+    When expected_text is given, decoding is constrained to that phrase, similar
+    word-bank words and [unk], which is faster and more reliable for short answers.
+    Results are memoized by audio content, so reruns do not decode again.
+    """
+    grammar = build_expected_grammar(expected_text) if expected_text else None
+    return transcribe_audio_vosk(audio, grammar=grammar)
 
-def play_audio_streamlit(audio_file_path):
-    """Play audio file in Streamlit"""
+def play_audio_streamlit(audio):
+    """Play audio (WAV bytes or file path) in Streamlit"""
     try:
-        if os.path.exists(audio_file_path):
-            with open(audio_file_path, 'rb') as audio_file:
-                audio_bytes = audio_file.read()
-                st.audio(audio_bytes, format='audio/wav')
+        if isinstance(audio, (bytes, bytearray, memoryview)):
+            st.audio(bytes(audio), format='audio/wav')
+        elif os.path.exists(audio):
+            # Let Streamlit's media manager read the file instead of buffering it here
+            st.audio(audio, format='audio/wav')
         else:
             st.error("Audio file not found")
     except Exception as e:
@@ -101,22 +672,11 @@ def play_audio_streamlit(audio_file_path):
 
 def get_voice_feedback(expected_text, spoken_text):
     """Compare expected text with spoken text and provide feedback"""
-    expected_words = expected_text.lower().split()
-    spoken_words = spoken_text.lower().split()
-    
     if expected_text.lower() == spoken_text.lower():
         return "Perfect! 🎉", 100
     
-    # Calculate similarity score
-    correct_words = 0
-    for word in spoken_words:
-        if word in expected_words:
-            correct_words += 1
-    
-    if len(spoken_words) > 0:
-        score = (correct_words / len(expected_words)) * 100
-    else:
-        score = 0
+    # Word-level edit-distance similarity (order-aware, penalizes missing and extra words)
+    score = token_similarity(_normalize_phrase(expected_text), _normalize_phrase(spoken_text)) * 100
     
     if score >= 80:
         feedback = "Great pronunciation! 👍"
@@ -128,18 +688,3 @@ def get_voice_feedback(expected_text, spoken_text):
         feedback = "Let's practice this word more. 💪"
     
     return feedback, score
-
-def cleanup_temp_files():
-    """Clean up temporary audio files"""
-    try:
-        temp_dir = tempfile.gettempdir()
-        for filename in os.listdir(temp_dir):
-            if filename.endswith('.wav') and filename.startswith('tmp'):
-                file_path = os.path.join(temp_dir, filename)
-                try:
-                    os.remove(file_path)
-                except:
-                    pass  # Ignore errors when cleaning up
-    except:
-        pass  # Ignore errors when cleaning up
-